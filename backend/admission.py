@@ -0,0 +1,156 @@
+"""
+Admission control for the Gemini-bound stages of /api/ask.
+
+Each stage (embed, generate) runs at most its configured number of requests
+at once. Further requests wait in a bounded queue, served by lane and then in
+arrival order:
+
+    priority   verse-reference questions ("Gita 2.47"): short prompts, quick answers
+    normal     everything else
+    compare    compare-mode questions, the most passages and the longest answers
+
+Cached answers never reach a stage. A request that finds its stage's queue
+full, or waits longer than ADMISSION_MAX_WAIT, is turned away at once with
+Overloaded, carrying a Retry-After estimate from the queue length and recent
+slot times, instead of piling onto an upstream that is already rate limiting.
+This is per process and per event loop, like the rest of the serving state.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+
+import metrics
+
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+GENERATE_CONCURRENCY = int(os.getenv("GENERATE_CONCURRENCY", "16"))
+# Requests waiting per stage, and seconds one may wait for a slot.
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+
+LANES = ("priority", "normal", "compare")
+# "2.47", "2:47", "chapter 2 verse 47", "verse 47".
+VERSE_REF_PAT = re.compile(r"\b\d+\s*[.:]\s*\d+\b|\b(?:chapter|canto|book)\s+\d+\b|\bverse\s+\d+\b", re.IGNORECASE)
+
+REJECTED = metrics.counter(
+    "sutra_admission_rejected_total",
+    "Requests turned away by admission control, by stage and reason (queue_full, timeout).",
+    labels=("stage", "reason"),
+)
+WAIT_SECONDS = metrics.histogram(
+    "sutra_admission_wait_seconds",
+    "Time admitted requests waited for a stage slot, by stage and lane.",
+    labels=("stage", "lane"),
+)
+
+
+class Overloaded(Exception):
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f"Too many requests waiting for {stage}; retry in {retry_after}s")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def request_lane(question: str, compare_texts: list[str] | None) -> str:
+    if compare_texts and len(compare_texts) >= 2:
+        return "compare"
+    if VERSE_REF_PAT.search(question):
+        return "priority"
+    return "normal"
+
+
+class StageGate:
+    """A concurrency limit with a bounded, lane-ordered wait queue."""
+
+    def __init__(self, name: str, limit: int, max_queue: int = ADMISSION_QUEUE_SIZE, max_wait: float = ADMISSION_MAX_WAIT):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        # (lane rank, arrival, future); cancelled futures are skipped on release.
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        # Moving average of how long a slot is held, for Retry-After.
+        self._mean_hold = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil((self.waiting + 1) / self.limit * self._mean_hold))
+
+    def _reject(self, reason: str):
+        REJECTED.inc(stage=self.name, reason=reason)
+        raise Overloaded(self.name, reason, self.retry_after())
+
+    async def acquire(self, lane: str = "normal", max_wait: float | None = None):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            WAIT_SECONDS.observe(0.0, stage=self.name, lane=lane)
+            return
+        if self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        start = time.monotonic()
+        granted = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LANES.index(lane), next(self._arrivals), granted))
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self.max_wait if max_wait is None else max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if granted.done() and not granted.cancelled():
+                # The slot was handed over just as we gave up: pass it on.
+                self.release()
+            else:
+                granted.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout")
+            raise
+        WAIT_SECONDS.observe(time.monotonic() - start, stage=self.name, lane=lane)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting; False if none is free or others are waiting."""
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return True
+        return False
+
+    def release(self, held: float | None = None):
+        if held is not None:
+            self._mean_hold = 0.9 * self._mean_hold + 0.1 * held
+        while self._waiters:
+            _, _, granted = heapq.heappop(self._waiters)
+            if not granted.done():
+                # Hand the slot straight to the next waiter.
+                granted.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, lane: str = "normal", max_wait: float | None = None):
+        await self.acquire(lane, max_wait)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+
+class Admission:
+    """One StageGate per Gemini-bound stage."""
+
+    def __init__(self, embed: int = EMBED_CONCURRENCY, generate: int = GENERATE_CONCURRENCY):
+        self.embed = StageGate("embed", embed)
+        self.generate = StageGate("generate", generate)
+
+    def status(self) -> dict:
+        return {
+            gate.name: {"active": gate.active, "limit": gate.limit, "waiting": gate.waiting}
+            for gate in (self.embed, self.generate)
+        }
@@ -0,0 +1,86 @@
+"""
+Cache of generated answers for repeated questions.
+
+Keyed by the normalized question, its filters and the store version, so a
+store reload never serves answers built from the old passages. Only questions
+asked outside a conversation are cached, since a follow-up's answer depends
+on what came before it.
+
+When a deadline-limited query (ScriptureRAG.aquery) runs out of time, its
+generation can keep running in the background and land here, so asking the
+same question again returns the full answer at once.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Entries kept (0 disables the cache) and seconds each stays valid.
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+LOOKUPS = metrics.counter(
+    "sutra_answer_cache_lookups_total",
+    "Answer cache lookups by outcome (hit, miss).",
+    labels=("outcome",),
+)
+FILLS = metrics.counter(
+    "sutra_answer_cache_fills_total",
+    "Answers stored in the cache by source (inline, background).",
+    labels=("source",),
+)
+
+
+def cache_key(
+    question: str,
+    text_filter: str | None,
+    compare_texts: list[str] | None,
+    facets: dict[str, list[str]] | None,
+    store_version: str | None,
+) -> tuple:
+    return (
+        " ".join(question.lower().split()),
+        text_filter,
+        tuple(compare_texts or ()),
+        tuple(sorted((field, tuple(values)) for field, values in (facets or {}).items() if values)),
+        store_version,
+    )
+
+
+class AnswerCache:
+    """Answer dicts by cache_key(), least recently used evicted first."""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> dict | None:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        LOOKUPS.inc(outcome="miss" if entry is None else "hit")
+        return None if entry is None else dict(entry[1])
+
+    def put(self, key: tuple, result: dict, source: str = "inline"):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        FILLS.inc(source=source)
@@ -0,0 +1,19 @@
+"""
+Offline benchmarks for retrieval and the RAG pipeline.
+
+Everything runs against the committed corpus files with a deterministic
+stand-in for genai.Client (see fakes.py), so results depend only on the code
+and the machine. Run from backend/:
+
+    python -m benchmarks run                      # writes benchmarks/results/<commit>.json
+    python -m benchmarks run --scale 1000000 --dim 256
+    python -m benchmarks eval --golden           # recall@k / MRR / latency per search config
+    python -m benchmarks eval --store vector_store_multi.pkl
+    python -m benchmarks compare OLD.json NEW.json
+    python -m benchmarks.loadtest --workers 1 2 --concurrency 1 8 32
+    python -m benchmarks.startup                  # import profile and time to ready
+    python -m benchmarks.connections              # tail latency with/without connection reuse
+
+The load test serves main.app through uvicorn with the same stand-in, adding
+configurable upstream latency and injected 429s (see loadtest_app.py).
+"""
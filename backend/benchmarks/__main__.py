@@ -0,0 +1,119 @@
+"""Command-line entry point: python -m benchmarks {run,eval,compare}."""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import sys
+
+from benchmarks import pipeline, quality, report, retrieval
+from benchmarks.fakes import DEFAULT_DIM, FakeGenAIClient
+from embeddings import LocalEmbeddings
+
+
+def run(args):
+    client = FakeGenAIClient(dim=args.dim)
+    print(f"Building store from {args.corpus_dir} with {args.dim}-dim fake embeddings...")
+    store, results = retrieval.build_store(args.corpus_dir, client)
+
+    print("Benchmarking search()...")
+    results.update(retrieval.bench_search(store, "real", args.repeats))
+    results.update(retrieval.bench_batch(store, "real", 256, max(3, args.repeats // 20)))
+    for rows in args.scale:
+        print(f"  scaled to {rows:,} rows...")
+        scaled = retrieval.scale_store(store, rows)
+        results.update(retrieval.bench_search(scaled, f"{rows}", max(5, args.repeats // 10)))
+        results.update(retrieval.bench_batch(scaled, f"{rows}", 64, 3))
+        del scaled
+        gc.collect()
+
+    print("Benchmarking ScriptureRAG.query()...")
+    results.update(pipeline.bench_query(store, client, args.repeats))
+    results.update(pipeline.bench_deadline(store, max(20, args.repeats // 2)))
+
+    report.print_results(results)
+    config = {"dim": args.dim, "repeats": args.repeats, "scale": args.scale}
+    path = report.write_results(results, config, args.out)
+    print(f"\nWrote {path}")
+
+
+def evaluate(args):
+    if args.store:
+        client = None if os.getenv("GOOGLE_API_KEY") else quality.OfflineClient()
+        store = quality.MultiCorpusVectorStore.from_file(args.store, client=client)
+        cache = quality.QueryEmbeddingCache(args.cache)
+    elif args.provider == "local":
+        print(f"Building store from {args.corpus_dir} with local embeddings...")
+        store, _ = retrieval.build_store(args.corpus_dir, None, LocalEmbeddings())
+        cache = None
+    else:
+        print(f"Building store from {args.corpus_dir} with {args.dim}-dim fake embeddings...")
+        store, _ = retrieval.build_store(args.corpus_dir, FakeGenAIClient(dim=args.dim))
+        cache = None
+
+    cases = quality.load_golden(args.golden) if args.golden else quality.default_cases(store)
+    questions = [c["question"] for c in cases]
+    if cache is not None:
+        query_embs = cache.embed(store, questions)
+    else:
+        with contextlib.redirect_stdout(io.StringIO()):
+            query_embs = store._embed(questions)
+
+    configs = quality.usable_configs(args.configs, store.embeddings.shape[1])
+    print(f"Evaluating {len(configs)} configurations on {len(cases)} questions (k={args.k})...")
+    results = quality.evaluate(store, cases, query_embs, configs, args.k, args.repeats)
+    quality.print_quality(results, args.k)
+
+    config = {"store": args.store or args.provider, "embedding": store.provider.manifest(), "golden": args.golden, "k": args.k,
+              "cases": len(cases), "repeats": args.repeats}
+    path = report.write_results(results, config, args.out)
+    print(f"\nWrote {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmark suite")
+    p_run.add_argument("--corpus-dir", default=".")
+    p_run.add_argument("--dim", type=int, default=DEFAULT_DIM, help="fake embedding dimensions")
+    p_run.add_argument("--repeats", type=int, default=200, help="searches/queries per case")
+    p_run.add_argument("--scale", type=int, nargs="*", default=[100_000],
+                       help="synthetic corpus sizes, e.g. --scale 100000 1000000")
+    p_run.add_argument("--out", help="result file (default: benchmarks/results/<commit>.json)")
+
+    p_eval = sub.add_parser("eval", help="retrieval quality and latency per search configuration")
+    p_eval.add_argument("--store", help="saved store pickle (default: build one from the corpora)")
+    p_eval.add_argument("--provider", choices=["fake", "local"], default="fake",
+                        help="embeddings for a store built from the corpora")
+    p_eval.add_argument("--cache", default=quality.CACHE_PATH, help="question embedding cache")
+    p_eval.add_argument("--golden", nargs="?", const=quality.GOLDEN_PATH,
+                        help="golden set JSON (default file if no path given); "
+                             "without it every benchmark question is scored against exact search")
+    p_eval.add_argument("--configs", nargs="+", default=list(quality.CONFIGS), choices=list(quality.CONFIGS))
+    p_eval.add_argument("--k", type=int, default=quality.DEFAULT_K)
+    p_eval.add_argument("--repeats", type=int, default=3, help="timed rank() calls per question")
+    p_eval.add_argument("--corpus-dir", default=".")
+    p_eval.add_argument("--dim", type=int, default=DEFAULT_DIM, help="fake embedding dimensions")
+    p_eval.add_argument("--out", help="result file (default: benchmarks/results/<commit>.json)")
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=report.REGRESSION_THRESHOLD)
+    p_cmp.add_argument("--fail-on-regression", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "eval":
+        evaluate(args)
+    else:
+        regressions = report.compare(args.old, args.new, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Tail latency of Gemini calls with and without connection reuse.
+
+Runs bursts of concurrent embed_content calls through the real google-genai
+client against the local stand-in (benchmarks/standin.py), which charges a
+fixed cost for every new connection. Each client setup is measured in turn:
+
+    no_keepalive  every call opens a new connection
+    sdk_default   the SDK's own httpx client (20 idle connections, 5s expiry)
+    shared_pool   genai_client's pool sized to the burst, long keep-alive
+
+Run from backend/:
+
+    python -m benchmarks.connections --concurrency 32 --bursts 20 --connect-cost 0.1
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.report import print_results, summarize, write_results
+from benchmarks.retrieval import QUESTIONS
+from benchmarks.standin import GeminiStandIn
+from embeddings import EMBEDDING_MODEL
+from genai_client import build_client, types
+
+
+def make_clients(url: str, concurrency: int) -> dict:
+    from google import genai
+
+    return {
+        "no_keepalive": build_client("standin", base_url=url, pool_size=concurrency, keepalive=0),
+        "sdk_default": genai.Client(api_key="standin", http_options=types().HttpOptions(base_url=url)),
+        "shared_pool": build_client("standin", base_url=url, pool_size=concurrency),
+    }
+
+
+def run_bursts(client, concurrency: int, bursts: int, gap: float) -> list[float]:
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        client.models.embed_content(model=EMBEDDING_MODEL, contents=[QUESTIONS[i % len(QUESTIONS)]])
+        return time.perf_counter() - start
+
+    samples = []
+    with ThreadPoolExecutor(concurrency) as pool:
+        for b in range(bursts):
+            samples.extend(pool.map(call, range(b * concurrency, (b + 1) * concurrency)))
+            if gap:
+                time.sleep(gap)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.connections")
+    parser.add_argument("--concurrency", type=int, default=32, help="calls per burst")
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--gap", type=float, default=0.1, help="seconds between bursts")
+    parser.add_argument("--latency", type=float, default=0.1, help="stand-in seconds per call")
+    parser.add_argument("--connect-cost", type=float, default=0.1, help="stand-in seconds per new connection")
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    results = {}
+    with GeminiStandIn(embed_latency=args.latency, connect_cost=args.connect_cost, dim=64) as standin:
+        for name, client in make_clients(standin.url, args.concurrency).items():
+            run_bursts(client, args.concurrency, 1, 0)  # warm up
+            opened = standin.connections
+            samples = run_bursts(client, args.concurrency, args.bursts, args.gap)
+            results[f"connections.{name}"] = {**summarize(samples), "new_connections": standin.connections - opened}
+
+    print_results(results)
+    for name, r in results.items():
+        print(f"  {name}: {r['new_connections']} new connections")
+    print(f"\nWrote {write_results(results, vars(args), args.out)}")
+
+
+if __name__ == "__main__":
+    main()
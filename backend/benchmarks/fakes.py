@@ -0,0 +1,142 @@
+"""
+Deterministic local stand-in for genai.Client.
+
+Embeddings are signed feature-hashed bags of words, so texts that share words
+score higher against each other and every run produces the same vectors.
+Generation echoes the question with token counts derived from prompt length.
+Optional latencies (with a lognormal tail) and injected 429 errors let
+benchmarks and load tests model the network and quota without either.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+
+import numpy as np
+
+DEFAULT_DIM = 768
+TOKEN_PAT = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=200_000)
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def hashed_embedding(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    vec = np.zeros(dim, dtype=np.float32)
+    hashes = [_token_hash(t) for t in TOKEN_PAT.findall(text.lower())]
+    if not hashes:
+        vec[0] = 1.0
+        return vec
+    h = np.array(hashes, dtype=np.uint64)
+    signs = np.where((h >> np.uint64(63)) == 1, -1.0, 1.0).astype(np.float32)
+    np.add.at(vec, (h % np.uint64(dim)).astype(np.int64), signs)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGenAIClient"):
+        self._client = client
+
+    def embed_content(self, model: str, contents, config=None):
+        self._client.embed_calls += 1
+        self._client._simulate(self._client.embed_latency)
+        return _embedded(contents, self._client.dim)
+
+    def generate_content(self, model: str, contents, config=None):
+        self._client.generate_calls += 1
+        self._client._simulate(self._client.generate_latency)
+        return _generated(contents)
+
+
+class _FakeAsyncModels:
+    """client.aio.models: the same responses, with latency slept on the event loop."""
+
+    def __init__(self, client: "FakeGenAIClient"):
+        self._client = client
+
+    async def embed_content(self, model: str, contents, config=None):
+        self._client.embed_calls += 1
+        delay, fail = self._client._draw(self._client.embed_latency)
+        await asyncio.sleep(delay)
+        self._client._maybe_fail(fail)
+        return _embedded(contents, self._client.dim)
+
+    async def generate_content(self, model: str, contents, config=None):
+        self._client.generate_calls += 1
+        delay, fail = self._client._draw(self._client.generate_latency)
+        await asyncio.sleep(delay)
+        self._client._maybe_fail(fail)
+        return _generated(contents)
+
+
+def _embedded(contents, dim: int):
+    if isinstance(contents, str):
+        contents = [contents]
+    return SimpleNamespace(embeddings=[SimpleNamespace(values=hashed_embedding(t, dim).tolist()) for t in contents])
+
+
+def _generated(contents):
+    prompt = contents if isinstance(contents, str) else str(contents)
+    first_line = prompt.split("\n", 1)[0]
+    text = f"## Direct Answer\nDeterministic answer to {first_line!r} from {prompt.count('--- ')} passages."
+    usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+    return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeGenAIClient:
+    """Drop-in for genai.Client covering the calls the store and RAG make."""
+
+    def __init__(
+        self,
+        dim: int = DEFAULT_DIM,
+        embed_latency: float = 0.0,
+        generate_latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.embed_calls = 0
+        self.generate_calls = 0
+        self.errors_injected = 0
+        self.models = _FakeModels(self)
+        self.aio = SimpleNamespace(models=_FakeAsyncModels(self))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self, latency: float) -> tuple[float, bool]:
+        """A (lognormally jittered) latency, and whether the call fails."""
+        with self._lock:
+            jitter = self._rng.lognormvariate(0.0, self.latency_jitter) if self.latency_jitter else 1.0
+            fail = self._rng.random() < self.error_rate
+        return latency * jitter, fail
+
+    def _simulate(self, latency: float):
+        """Sleep for a (lognormally jittered) latency, then maybe fail with a 429."""
+        delay, fail = self._draw(latency)
+        if delay:
+            time.sleep(delay)
+        self._maybe_fail(fail)
+
+    def _maybe_fail(self, fail: bool):
+        if fail:
+            from google.genai import errors
+
+            self.errors_injected += 1
+            raise errors.ClientError(429, {"error": {
+                "code": 429,
+                "message": "Resource has been exhausted (e.g. check quota).",
+                "status": "RESOURCE_EXHAUSTED",
+            }})
@@ -0,0 +1,98 @@
+"""
+Tail latency of generate_content with and without hedged requests.
+
+Sends the same sequence of generations through the real google-genai async
+client against the local stand-in (benchmarks/standin.py), configured with
+lognormal latency and occasional stragglers, once unhedged and once through
+hedging.HedgePolicy. Reports latency percentiles, hedges sent and won, and
+the extra calls the upstream saw. With --slots, every call runs under an
+admission gate of that many slots, as in ScriptureRAG, and hedges only use
+the slots the primaries leave free.
+
+Run from backend/:
+
+    python -m benchmarks.hedging --requests 400 --concurrency 4 --slow-rate 0.03 --slow-latency 1.0
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.report import print_results, summarize, write_results
+from benchmarks.retrieval import QUESTIONS
+from benchmarks.standin import GeminiStandIn
+from genai_client import build_client
+from admission import StageGate
+from hedging import HEDGE_WINS, HEDGES, HedgePolicy
+
+MODEL = "gemini-2.5-flash"
+
+
+async def run_requests(
+    client, requests: int, concurrency: int, policy: HedgePolicy | None, slots: int = 0
+) -> list[float]:
+    samples = []
+    queue = list(range(requests))
+    gate = StageGate("generate", slots) if slots else None
+
+    async def worker():
+        while queue:
+            i = queue.pop()
+
+            def call(question=QUESTIONS[i % len(QUESTIONS)]):
+                return client.aio.models.generate_content(model=MODEL, contents=question)
+
+            start = time.perf_counter()
+            if gate is None:
+                await (call() if policy is None else policy.run(call))
+            else:
+                async with gate.slot():
+                    await (call() if policy is None else policy.run(call, gate))
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.hedging")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="stand-in median seconds per call")
+    parser.add_argument("--latency-jitter", type=float, default=0.3)
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="fraction of calls that straggle")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="extra seconds for a straggler")
+    parser.add_argument("--percentile", type=float, default=95.0)
+    parser.add_argument("--max-rate", type=float, default=0.1)
+    parser.add_argument("--slots", type=int, default=0, help="admission slots for calls and hedges (0: no gate)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    results = {}
+    policies = {
+        "unhedged": lambda: None,
+        "hedged": lambda: HedgePolicy(percentile=args.percentile, max_rate=args.max_rate),
+    }
+    for name, make_policy in policies.items():
+        with GeminiStandIn(generate_latency=args.latency, latency_jitter=args.latency_jitter, dim=64,
+                           slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=args.seed) as standin:
+            client = build_client("standin", base_url=standin.url, pool_size=2 * args.concurrency)
+            policy = make_policy()
+            sent, won = HEDGES.value(outcome="sent"), HEDGE_WINS.value(winner="hedge")
+            samples = asyncio.run(run_requests(client, args.requests, args.concurrency, policy, args.slots))
+            results[f"hedging.{name}"] = {
+                **summarize(samples),
+                "hedges": int(HEDGES.value(outcome="sent") - sent),
+                "hedge_wins": int(HEDGE_WINS.value(winner="hedge") - won),
+                "upstream_calls": standin.requests,
+            }
+
+    print_results(results)
+    for name, r in results.items():
+        print(f"  {name}: {r['hedges']} hedges ({r['hedge_wins']} won), {r['upstream_calls']} upstream calls")
+    print(f"\nWrote {write_results(results, vars(args), args.out)}")
+
+
+if __name__ == "__main__":
+    main()
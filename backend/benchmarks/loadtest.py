@@ -0,0 +1,206 @@
+"""
+Load test for the FastAPI service against a mock Gemini backend.
+
+Starts `uvicorn benchmarks.loadtest_app:app` once per worker count, drives
+/api/ask, /api/texts and /api/health with a weighted question mix at each
+concurrency level, and reports throughput, latency percentiles and error
+rates per request kind. Run from backend/:
+
+    python -m benchmarks.loadtest --workers 1 2 --concurrency 1 8 32 \\
+        --generate-latency 0.8 --latency-jitter 0.5 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fakes import FakeGenAIClient
+from benchmarks.report import summarize, write_results
+from benchmarks.retrieval import QUESTIONS
+from embeddings import GeminiEmbeddings
+from vector_store import MultiCorpusVectorStore
+
+DEFAULT_MIX = "single=0.45,all=0.2,compare=0.15,history=0.1,texts=0.05,health=0.05"
+
+
+def build_request(kind: str, rng: random.Random, texts: list[str]) -> tuple[str, str, dict | None]:
+    question = QUESTIONS[rng.randrange(len(QUESTIONS))]
+    if kind == "single":
+        return "POST", "/api/ask", {"question": question, "text_filter": rng.choice(texts)}
+    if kind == "all":
+        return "POST", "/api/ask", {"question": question}
+    if kind == "compare":
+        return "POST", "/api/ask", {"question": question, "compare_texts": rng.sample(texts, 2)}
+    if kind == "history":
+        return "POST", "/api/ask", {"question": question, "chat_history": [
+            {"role": "user", "content": QUESTIONS[rng.randrange(len(QUESTIONS))]},
+            {"role": "assistant", "content": "The text describes this at length. " * 30},
+        ]}
+    if kind == "texts":
+        return "GET", "/api/texts", None
+    if kind == "health":
+        return "GET", "/api/health", None
+    raise ValueError(f"unknown request kind: {kind}")
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        kind, weight = part.split("=")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+async def drive(base_url: str, concurrency: int, duration: float, mix: dict[str, float],
+                texts: list[str], seed: int) -> dict:
+    samples: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    kinds, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    async def user(client: httpx.AsyncClient, rng: random.Random):
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = build_request(kind, rng, texts)
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, path, json=body)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            samples.setdefault(kind, []).append(time.perf_counter() - start)
+            if not ok:
+                errors[kind] = errors.get(kind, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client, random.Random(seed + i)) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    results = {}
+    total = sum(len(v) for v in samples.values())
+    results["all"] = {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        **summarize([s for v in samples.values() for s in v]),
+    }
+    for kind, values in samples.items():
+        results[kind] = {
+            "requests": len(values),
+            "error_rate": round(errors.get(kind, 0) / len(values), 4),
+            **summarize(values),
+        }
+    return results
+
+
+def build_mock_store(dim: int, path: str):
+    provider = GeminiEmbeddings(client=FakeGenAIClient(dim=dim))
+    provider.batch_pause = 0.0
+    store = MultiCorpusVectorStore(provider=provider)
+    with contextlib.redirect_stdout(io.StringIO()):
+        store.build_from_corpus_files(".")
+        store.save(path)
+    return list(store.text_indices)
+
+
+def start_server(port: int, workers: int, env: dict) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "benchmarks.loadtest_app:app",
+           "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, env={**os.environ, **env})
+
+
+def mock_env(store_path: str, dim: int, embed_latency: float = 0.0, generate_latency: float = 0.0,
+             latency_jitter: float = 0.0, error_rate: float = 0.0) -> dict:
+    return {
+        "VECTOR_STORE_PATH": store_path,
+        "MOCK_GEMINI_DIM": str(dim),
+        "MOCK_EMBED_LATENCY": str(embed_latency),
+        "MOCK_GENERATE_LATENCY": str(generate_latency),
+        "MOCK_LATENCY_JITTER": str(latency_jitter),
+        "MOCK_ERROR_RATE": str(error_rate),
+    }
+
+
+@contextlib.contextmanager
+def serve(port: int, workers: int, env: dict):
+    proc = start_server(port, workers, env)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(300):
+            try:
+                if httpx.get(f"{base_url}/api/ready", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.2)
+        else:
+            raise RuntimeError("server did not become ready")
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def print_table(label: str, results: dict):
+    print(f"\n{label}")
+    for kind, r in results.items():
+        rps = f"{r['throughput_rps']:>8.2f} rps" if "throughput_rps" in r else " " * 12
+        print(f"  {kind:<8} {rps}  n={r['requests']:<6} err {r['error_rate']:>6.1%}  "
+              f"p50 {r['p50_ms']:>8.1f} ms  p90 {r['p90_ms']:>8.1f}  p99 {r['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="kind=weight,... of " + DEFAULT_MIX)
+    parser.add_argument("--embed-latency", type=float, default=0.1)
+    parser.add_argument("--generate-latency", type=float, default=1.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "loadtest_store.pkl")
+        print(f"Building mock store ({args.dim} dims)...")
+        texts = build_mock_store(args.dim, store_path)
+        env = mock_env(store_path, args.dim, args.embed_latency, args.generate_latency,
+                       args.latency_jitter, args.error_rate)
+        for workers in args.workers:
+            with serve(args.port, workers, env) as base_url:
+                for concurrency in args.concurrency:
+                    label = f"workers={workers} concurrency={concurrency}"
+                    run = asyncio.run(drive(base_url, concurrency, args.duration, mix, texts, args.seed))
+                    print_table(label, run)
+                    results[label] = run
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    flat = {f"loadtest.{label}.{kind}": r for label, run in results.items() for kind, r in run.items()}
+    print(f"\nWrote {write_results(flat, config, args.out)}")
+    if args.out is None:
+        print(json.dumps({label: run["all"]["throughput_rps"] for label, run in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+ASGI app for load tests: main.app with the shared genai client replaced by
+FakeGenAIClient.
+
+Configured through environment variables set by benchmarks.loadtest so that
+every uvicorn worker builds the same mock backend:
+
+    VECTOR_STORE_PATH       store pickle built with the fake embeddings
+    MOCK_GEMINI_DIM         embedding dimensions (must match the store)
+    MOCK_EMBED_LATENCY      seconds per embed_content call
+    MOCK_GENERATE_LATENCY   seconds per generate_content call
+    MOCK_LATENCY_JITTER     lognormal sigma applied to both latencies
+    MOCK_ERROR_RATE         probability of a 429 RESOURCE_EXHAUSTED per call
+"""
+
+import os
+
+import genai_client
+from benchmarks.fakes import DEFAULT_DIM, FakeGenAIClient
+
+
+def _mock_client() -> FakeGenAIClient:
+    return FakeGenAIClient(
+        dim=int(os.getenv("MOCK_GEMINI_DIM", DEFAULT_DIM)),
+        embed_latency=float(os.getenv("MOCK_EMBED_LATENCY", "0")),
+        generate_latency=float(os.getenv("MOCK_GENERATE_LATENCY", "0")),
+        latency_jitter=float(os.getenv("MOCK_LATENCY_JITTER", "0")),
+        error_rate=float(os.getenv("MOCK_ERROR_RATE", "0")),
+        seed=os.getpid(),
+    )
+
+
+os.environ.setdefault("GOOGLE_API_KEY", "mock")
+genai_client.set_client(_mock_client())
+
+from main import app  # noqa: E402
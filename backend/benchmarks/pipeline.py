@@ -0,0 +1,78 @@
+"""
+End-to-end ScriptureRAG.query overhead with a zero-latency generation stand-in,
+the mean prompt size each mode sends, and aquery() latency against a
+long-tailed generation with and without a deadline.
+"""
+
+import asyncio
+import random
+import time
+
+import metrics
+from answer_cache import AnswerCache
+from benchmarks.fakes import FakeGenAIClient
+from benchmarks.report import summarize
+from benchmarks.retrieval import QUESTIONS
+from rag import LLM_TOKENS, ScriptureRAG
+
+
+def bench_query(store, client: FakeGenAIClient, repeats: int, seed: int = 0) -> dict:
+    rag = ScriptureRAG(store, client=client)
+    texts = list(store.text_indices)
+    rng = random.Random(seed)
+    modes = {
+        "all": {},
+        "single_text": {"text_filter": texts[0]},
+        "compare": {"compare_texts": texts[:2]},
+        "chat_history": {"chat_history": [
+            {"role": "user", "content": "What is dharma?"},
+            {"role": "assistant", "content": "Dharma is described as duty. " * 60},
+        ]},
+    }
+
+    results = {}
+    for name, kwargs in modes.items():
+        totals = []
+        stages: dict[str, list[float]] = {}
+        tokens_before = LLM_TOKENS.value(direction="in")
+        for _ in range(repeats):
+            question = QUESTIONS[rng.randrange(len(QUESTIONS))]
+            with metrics.trace() as timings:
+                start = time.perf_counter()
+                rag.query(question, score_threshold=0.0, **kwargs)
+                totals.append(time.perf_counter() - start)
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+        results[f"rag.query.{name}"] = summarize(totals)
+        prompt_tokens = (LLM_TOKENS.value(direction="in") - tokens_before) / repeats
+        results[f"rag.query.{name}.prompt_tokens"] = {"mean": round(prompt_tokens, 1)}
+        for stage, samples in stages.items():
+            results[f"rag.query.{name}.{stage}"] = summarize(samples)
+    return results
+
+
+def bench_deadline(store, repeats: int, latency: float = 0.05, jitter: float = 1.0, seed: int = 0) -> dict:
+    """aquery() with lognormally jittered generation latency, unbounded vs a deadline of 2x the median."""
+    results = {}
+    for name, deadline in {"none": 0.0, "2x_median": 2 * latency}.items():
+        client = FakeGenAIClient(dim=store.embeddings.shape[1], generate_latency=latency,
+                                 latency_jitter=jitter, seed=seed)
+        rag = ScriptureRAG(store, client=client)
+        rag.answers = AnswerCache(max_entries=0)
+        rag.background_completion = False
+        rng = random.Random(seed)
+
+        async def run() -> tuple[list[float], int]:
+            samples, degraded = [], 0
+            for _ in range(repeats):
+                question = QUESTIONS[rng.randrange(len(QUESTIONS))]
+                start = time.perf_counter()
+                result = await rag.aquery(question, score_threshold=0.0, deadline=deadline)
+                samples.append(time.perf_counter() - start)
+                degraded += bool(result.get("degraded"))
+            return samples, degraded
+
+        samples, degraded = asyncio.run(run())
+        results[f"rag.aquery.deadline_{name}"] = summarize(samples)
+        results[f"rag.aquery.deadline_{name}.degraded"] = {"fraction": round(degraded / repeats, 3)}
+    return results
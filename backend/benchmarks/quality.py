@@ -0,0 +1,205 @@
+"""
+Retrieval quality and speed of alternative search configurations.
+
+A configuration transforms the document and query embeddings (lower precision,
+fewer dimensions, ...) and is scored side by side with the others on the same
+questions: recall@k and MRR against the exact float32 top-k of the unmodified
+store, against a golden set of expected verse IDs when one is given, and
+rank() latency. Document embeddings come from the store pickle and question
+embeddings from a local cache, so a run needs no network once the cache holds
+every question. Stores built with the local embedding provider never need it.
+
+Golden set format (JSON list):
+
+    [{"question": "What is the soul?", "text_filter": "Bhagavad Gita",
+      "relevant": ["bhagavad_gita_2_20", "bhagavad_gita_2_23"]}]
+
+text_filter / text_filters are optional and restrict the search as in
+search(). Verse IDs are the store's document IDs (see doc_table.py), and a
+result counts as relevant when its ID is listed.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.report import summarize
+from benchmarks.retrieval import QUESTIONS
+from vector_store import MultiCorpusVectorStore
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "cache", "query_embeddings.npz")
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "golden.json")
+DEFAULT_K = 10
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-10)
+
+
+def _truncate(dims: int):
+    def transform(m: np.ndarray) -> np.ndarray:
+        return _normalize(m[:, :dims].astype(np.float32))
+    return transform
+
+
+def _int8(m: np.ndarray) -> np.ndarray:
+    # Per-row scaling does not change cosine scores, so the codes alone rank.
+    scale = np.abs(m).max(axis=1, keepdims=True) / 127
+    return np.round(m / np.where(scale == 0, 1, scale)).astype(np.int8)
+
+
+def _float16(m: np.ndarray) -> np.ndarray:
+    return m.astype(np.float16)
+
+
+# name -> (document transform, query transform); None leaves embeddings as they are.
+CONFIGS = {
+    "exact": (None, None),
+    "float16": (_float16, _float16),
+    "int8": (_int8, None),
+    "dims-512": (_truncate(512), _truncate(512)),
+    "dims-256": (_truncate(256), _truncate(256)),
+    "dims-128": (_truncate(128), _truncate(128)),
+}
+
+
+class OfflineClient:
+    """Client for Gemini stores loaded without an API key; any embedding call fails."""
+
+    class models:
+        @staticmethod
+        def embed_content(model: str, contents, config=None):
+            raise RuntimeError("question embedding is not cached; set GOOGLE_API_KEY once to fill the cache")
+
+
+class QueryEmbeddingCache:
+    """Question embeddings on disk, keyed by embedding provider, model and question text."""
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self.vectors: dict[str, np.ndarray] = {}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+
+    @staticmethod
+    def key(manifest: dict, text: str) -> str:
+        model = f"{manifest['provider']}/{manifest['model']}/{manifest['dims']}"
+        return hashlib.sha1(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, store: MultiCorpusVectorStore, texts: list[str]) -> np.ndarray:
+        manifest = store.provider.manifest()
+        missing = [t for t in dict.fromkeys(texts) if self.key(manifest, t) not in self.vectors]
+        if missing:
+            print(f"Embedding {len(missing)} uncached questions...")
+            for text, vec in zip(missing, store._embed(missing)):
+                self.vectors[self.key(manifest, text)] = vec
+            self.save()
+        return np.stack([self.vectors[self.key(manifest, t)] for t in texts])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        keys = list(self.vectors)
+        np.savez(self.path, keys=np.array(keys), vectors=np.stack([self.vectors[k] for k in keys]))
+
+
+def load_golden(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def default_cases(store: MultiCorpusVectorStore) -> list[dict]:
+    """Every benchmark question over all texts and over each text alone."""
+    cases = [{"question": q} for q in QUESTIONS]
+    for name in store.text_indices:
+        cases.extend({"question": q, "text_filter": name} for q in QUESTIONS)
+    return cases
+
+
+def derive_store(store: MultiCorpusVectorStore, transform) -> MultiCorpusVectorStore:
+    variant = copy.copy(store)
+    if transform is not None:
+        variant.embeddings = transform(store.embeddings)
+    return variant
+
+
+def _filters(case: dict) -> dict:
+    return {"text_filter": case.get("text_filter"), "text_filters": case.get("text_filters")}
+
+
+def _reciprocal_rank(hits: list[bool]) -> float:
+    for rank, hit in enumerate(hits, 1):
+        if hit:
+            return 1.0 / rank
+    return 0.0
+
+
+def evaluate(
+    store: MultiCorpusVectorStore,
+    cases: list[dict],
+    query_embs: np.ndarray,
+    configs: list[str],
+    k: int = DEFAULT_K,
+    repeats: int = 3,
+) -> dict:
+    exact = [indices for indices, _ in store.rank_batch(query_embs, k, [_filters(c) for c in cases])]
+    results = {}
+    for name in configs:
+        doc_fn, query_fn = CONFIGS[name]
+        variant = derive_store(store, doc_fn)
+        queries = query_fn(query_embs) if query_fn else query_embs
+
+        exact_recall, exact_rr, golden_recall, golden_rr, samples = [], [], [], [], []
+        for case, query, truth in zip(cases, queries, exact):
+            for _ in range(repeats):
+                start = time.perf_counter()
+                indices, _ = variant.rank(query, k, **_filters(case))
+                samples.append(time.perf_counter() - start)
+
+            if len(truth):
+                exact_recall.append(len(np.intersect1d(indices, truth)) / len(truth))
+                exact_rr.append(_reciprocal_rank([i == truth[0] for i in indices]))
+            relevant = set(case.get("relevant", ()))
+            if relevant:
+                ids = [store.documents[int(i)]["id"] for i in indices]
+                golden_recall.append(len(relevant.intersection(ids)) / len(relevant))
+                golden_rr.append(_reciprocal_rank([doc_id in relevant for doc_id in ids]))
+
+        row = {
+            f"exact_recall@{k}": round(float(np.mean(exact_recall)), 4) if exact_recall else None,
+            "exact_mrr": round(float(np.mean(exact_rr)), 4) if exact_rr else None,
+            **summarize(samples),
+        }
+        if golden_recall:
+            row[f"golden_recall@{k}"] = round(float(np.mean(golden_recall)), 4)
+            row["golden_mrr"] = round(float(np.mean(golden_rr)), 4)
+        results[f"quality.{name}"] = row
+    return results
+
+
+def usable_configs(names: list[str], dim: int) -> list[str]:
+    """Drop truncation configs that would not shrink the embeddings."""
+    usable = []
+    for name in names:
+        if name.startswith("dims-") and int(name.split("-")[1]) >= dim:
+            print(f"  skipping {name}: store has {dim} dimensions")
+            continue
+        usable.append(name)
+    return usable
+
+
+def print_quality(results: dict, k: int):
+    golden = any(f"golden_recall@{k}" in r for r in results.values())
+    header = f"  {'config':<10} {'recall@' + str(k):>10} {'MRR':>7}"
+    if golden:
+        header += f" {'golden R@' + str(k):>12} {'golden MRR':>11}"
+    print(header + f" {'p50 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        line = f"  {name.split('.', 1)[1]:<10} {r[f'exact_recall@{k}']:>10.4f} {r['exact_mrr']:>7.4f}"
+        if golden:
+            line += f" {r.get(f'golden_recall@{k}', 0):>12.4f} {r.get('golden_mrr', 0):>11.4f}"
+        print(line + f" {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f}")
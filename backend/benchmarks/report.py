@@ -0,0 +1,92 @@
+"""Summaries, result files and commit-to-commit comparison for benchmark runs."""
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REGRESSION_THRESHOLD = 0.10
+
+
+def summarize(samples_s: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000
+    return {
+        "n": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(results: dict, config: dict, path: str | None = None) -> str:
+    commit = git_commit()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{commit}.json")
+    payload = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def print_results(results: dict):
+    width = max(len(name) for name in results) if results else 0
+    for name, r in results.items():
+        if "p50_ms" in r:
+            print(f"  {name:<{width}}  p50 {r['p50_ms']:>9.3f} ms  p90 {r['p90_ms']:>9.3f}  "
+                  f"p99 {r['p99_ms']:>9.3f}  (n={r['n']})")
+        else:
+            print(f"  {name:<{width}}  {r}")
+
+
+def compare(old_path: str, new_path: str, threshold: float = REGRESSION_THRESHOLD) -> int:
+    """Print p50/p99 deltas between two result files; return the number of regressions."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old['commit']} -> {new['commit']}")
+    if old["machine"] != new["machine"]:
+        print("  warning: results come from different machines")
+
+    regressions = 0
+    for name, n in new["results"].items():
+        o = old["results"].get(name)
+        if o is None or "p50_ms" not in n:
+            continue
+        cells = []
+        flagged = False
+        for key in ("p50_ms", "p99_ms"):
+            delta = (n[key] - o[key]) / o[key] if o[key] else 0.0
+            flagged |= delta > threshold
+            cells.append(f"{key[:3]} {o[key]:.3f} -> {n[key]:.3f} ({delta:+.0%})")
+        regressions += flagged
+        print(f"  {'REGRESSION ' if flagged else ''}{name}: {'  '.join(cells)}")
+    return regressions
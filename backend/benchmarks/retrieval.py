@@ -0,0 +1,148 @@
+"""
+Store load time, search() latency across filters and corpus sizes, and
+rank_batch() against ranking the same queries one at a time.
+"""
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import FakeGenAIClient
+from benchmarks.report import summarize
+from embeddings import GeminiEmbeddings
+from vector_store import MultiCorpusVectorStore
+
+QUESTIONS = [
+    "What is the soul?",
+    "What is dharma?",
+    "What are the duties of a king?",
+    "How should a student behave towards his teacher?",
+    "What happens after death?",
+    "What is the nature of Brahman?",
+    "Why did Rama go into exile?",
+    "What is the punishment for theft?",
+    "How should spies be employed?",
+    "What is yoga?",
+    "What is the meaning of Om?",
+    "Who is a true renunciate?",
+    "What are the duties of a wife?",
+    "How is the treasury to be protected?",
+    "What is the relationship between the self and the body?",
+    "How did Hanuman find Sita?",
+]
+
+
+class TiledDocuments:
+    """Read-only stand-in for DocumentTable that repeats a real table to `rows` rows."""
+
+    def __init__(self, base, rows: int):
+        self.base = base
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, index: int):
+        return self.base[index % len(self.base)]
+
+
+def build_store(corpus_dir: str, client: FakeGenAIClient, provider=None) -> tuple[MultiCorpusVectorStore, dict]:
+    if provider is None:
+        provider = GeminiEmbeddings(client=client)
+        provider.batch_pause = 0.0
+    store = MultiCorpusVectorStore(provider=provider)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        store.build_from_corpus_files(corpus_dir)
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.pkl")
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.save(path)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        load_samples = []
+        for _ in range(5):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                MultiCorpusVectorStore.from_file(path, client=client)
+            load_samples.append(time.perf_counter() - start)
+
+    results = {
+        "store.build_fake_embeddings": summarize([build_s]),
+        "store.load": summarize(load_samples),
+        "store.pickle_mb": {"value": round(size_mb, 2), "documents": len(store.documents)},
+    }
+    return store, results
+
+
+def scale_store(store: MultiCorpusVectorStore, rows: int, seed: int = 0) -> MultiCorpusVectorStore:
+    """Synthetic store of `rows` documents: tiled real rows with jittered embeddings."""
+    n = len(store.documents)
+    reps = -(-rows // n)
+    rng = np.random.default_rng(seed)
+    embeddings = np.tile(store.embeddings, (reps, 1))[:rows]
+    embeddings += rng.normal(0, 0.01, size=embeddings.shape).astype(np.float32)
+
+    scaled = MultiCorpusVectorStore(provider=store.provider)
+    scaled.documents = TiledDocuments(store.documents, rows)
+    scaled.embeddings = embeddings
+    scaled.text_indices = {}
+    for name, idx in store.text_indices.items():
+        tiled = np.concatenate([idx + r * n for r in range(reps)])
+        scaled.text_indices[name] = tiled[tiled < rows]
+    return scaled
+
+
+def bench_search(store: MultiCorpusVectorStore, label: str, repeats: int, seed: int = 0) -> dict:
+    texts = list(store.text_indices)
+    rng = random.Random(seed)
+    filters = {
+        "all": {},
+        "single_text": {"text_filter": texts[0]},
+        "compare": {"text_filters": texts[:2]},
+    }
+    if store.facet_index is not None:
+        # One section of one text: the narrow scopes the facet index serves.
+        doc = next((d for d in (store.documents[i] for i in range(len(store.documents))) if d["section"]), None)
+        if doc is not None:
+            filters["facet_section"] = {"text_filter": doc["text_name"], "facets": {"section": [doc["section"]]}}
+    results = {}
+    for name, kwargs in filters.items():
+        samples = []
+        for i in range(repeats):
+            question = QUESTIONS[rng.randrange(len(QUESTIONS))]
+            start = time.perf_counter()
+            store.search(question, top_k=12, **kwargs)
+            samples.append(time.perf_counter() - start)
+        results[f"search.{label}.{name}"] = summarize(samples)
+    return results
+
+
+def bench_batch(store: MultiCorpusVectorStore, label: str, batch_size: int, repeats: int, seed: int = 0) -> dict:
+    """One rank_batch() call vs a rank() loop over the same queries and mixed filters."""
+    texts = list(store.text_indices)
+    rng = random.Random(seed)
+    options = [{}, {"text_filter": texts[0]}, {"text_filters": texts[:2]}]
+    questions = [QUESTIONS[rng.randrange(len(QUESTIONS))] for _ in range(batch_size)]
+    filters = [options[rng.randrange(len(options))] for _ in range(batch_size)]
+    query_embs = store._embed(questions)
+
+    loop, batch = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for query, f in zip(query_embs, filters):
+            store.rank(query, 12, **f)
+        loop.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        store.rank_batch(query_embs, 12, filters)
+        batch.append(time.perf_counter() - start)
+    return {
+        f"rank_batch.{label}.loop_{batch_size}": summarize(loop),
+        f"rank_batch.{label}.batch_{batch_size}": summarize(batch),
+    }
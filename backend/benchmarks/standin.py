@@ -0,0 +1,173 @@
+"""
+Local HTTP stand-in for the Gemini REST API.
+
+Serves batchEmbedContents and generateContent on 127.0.0.1 with the same
+deterministic hashed embeddings as fakes.py. Response latency, occasional
+stragglers (calls that take slow_latency longer), a one-off cost
+for every new connection (standing in for the TCP and TLS handshakes a real
+client pays when it cannot reuse a connection) and injected 503s are all
+configurable, so the real google-genai client, its connection pool and its
+retry policy can be exercised without network access:
+
+    python -m benchmarks.standin --port 8790 --connect-cost 0.05
+    GEMINI_BASE_URL=http://127.0.0.1:8790 GOOGLE_API_KEY=x uvicorn main:app
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fakes import DEFAULT_DIM, hashed_embedding
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def setup(self):
+        super().setup()
+        self.server.standin._on_connect()
+
+    def do_POST(self):
+        standin = self.server.standin
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith(":batchEmbedContents"):
+            latency = standin.embed_latency
+            texts = [" ".join(p.get("text", "") for p in r["content"]["parts"]) for r in body["requests"]]
+            payload = {"embeddings": [{"values": hashed_embedding(t, standin.dim).tolist()} for t in texts]}
+        elif self.path.endswith(":generateContent"):
+            latency = standin.generate_latency
+            prompt = " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+            text = f"## Direct Answer\nStand-in answer from {prompt.count('--- ')} passages."
+            payload = {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+            }
+        else:
+            self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        delay, fail = standin._draw(latency)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._send(503, {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}})
+        else:
+            self._send(200, payload)
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of new connections overflow socketserver's default backlog of 5.
+    request_queue_size = 256
+    standin: "GeminiStandIn"
+
+    def handle_error(self, request, client_address):
+        # Clients that cancel a call (hedging, disconnects) close the socket mid-response.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class GeminiStandIn:
+    def __init__(
+        self,
+        port: int = 0,
+        dim: int = DEFAULT_DIM,
+        embed_latency: float = 0.0,
+        generate_latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        connect_cost: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+    ):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.latency_jitter = latency_jitter
+        self.connect_cost = connect_cost
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.connections = 0
+        self.requests = 0
+        self.errors_injected = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.standin = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _on_connect(self):
+        with self._lock:
+            self.connections += 1
+        if self.connect_cost:
+            time.sleep(self.connect_cost)
+
+    def _draw(self, latency: float) -> tuple[float, bool]:
+        with self._lock:
+            self.requests += 1
+            jitter = self._rng.lognormvariate(0.0, self.latency_jitter) if self.latency_jitter else 1.0
+            fail = self._rng.random() < self.error_rate
+            slow = self.slow_rate > 0 and self._rng.random() < self.slow_rate
+            self.errors_injected += fail
+        return latency * jitter + (self.slow_latency if slow else 0.0), fail
+
+    def start(self) -> "GeminiStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.standin")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--generate-latency", type=float, default=1.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.3)
+    parser.add_argument("--connect-cost", type=float, default=0.05, help="seconds per new connection")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of calls that straggle")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="extra seconds for a straggler")
+    args = parser.parse_args()
+
+    standin = GeminiStandIn(args.port, args.dim, args.embed_latency, args.generate_latency,
+                            args.latency_jitter, args.connect_cost, args.error_rate,
+                            slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    print(f"Gemini stand-in listening on {standin.url}")
+    standin._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
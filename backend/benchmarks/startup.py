@@ -0,0 +1,100 @@
+"""
+Cold-start profile of the API server.
+
+Reports the slowest modules imported by `import main` (from python -X
+importtime), then starts uvicorn on the load-test app (mock Gemini client,
+fake-embedding store) and measures how long the process takes to answer
+/api/health and to become ready on /api/ready. Run from backend/:
+
+    python -m benchmarks.startup --runs 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadtest import build_mock_store, mock_env, start_server
+from benchmarks.report import summarize, write_results
+
+
+def import_times(module: str = "main") -> list[tuple[str, float, float]]:
+    """(module, self seconds, cumulative seconds) for every module imported by `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "GOOGLE_API_KEY": "unused"},
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return rows
+
+
+def time_to_ready(port: int, env: dict) -> tuple[float, float]:
+    """Seconds from process start until /api/health answers and until /api/ready is 200."""
+    start = time.perf_counter()
+    proc = start_server(port, 1, env)
+    healthy = None
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        while time.perf_counter() - start < 60:
+            try:
+                if healthy is None and httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                    healthy = time.perf_counter() - start
+                if healthy is not None and httpx.get(f"{base_url}/api/ready", timeout=1).status_code == 200:
+                    return healthy, time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            time.sleep(0.01)
+        raise RuntimeError("server did not become ready")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--top", type=int, default=15, help="modules to list")
+    parser.add_argument("--runs", type=int, default=3, help="server starts to time")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    rows = import_times()
+    total = next((cumulative for name, _, cumulative in rows if name == "main"), 0.0)
+    print(f"import main: {total * 1000:.0f} ms; slowest modules (cumulative):")
+    for name, self_s, cumulative in sorted(rows, key=lambda r: -r[2])[1 : args.top + 1]:
+        print(f"  {name:<40} {cumulative * 1000:>8.1f} ms  (self {self_s * 1000:.1f} ms)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "startup_store.pkl")
+        build_mock_store(args.dim, store_path)
+        env = mock_env(store_path, args.dim)
+        healthy, ready = [], []
+        for _ in range(args.runs):
+            h, r = time_to_ready(args.port, env)
+            healthy.append(h)
+            ready.append(r)
+
+    results = {
+        "startup.import_main": {"value": round(total * 1000, 1)},
+        "startup.healthy": summarize(healthy),
+        "startup.ready": summarize(ready),
+    }
+    print(f"\nhealthy after {results['startup.healthy']['p50_ms']:.0f} ms, "
+          f"ready after {results['startup.ready']['p50_ms']:.0f} ms (p50 of {args.runs} starts)")
+    print(f"Wrote {write_results(results, vars(args), args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Server-side conversation state for chat follow-ups.
+
+Instead of re-sending its whole chat history with every question, a client
+can send a conversation_id. Each answered turn is folded into a rolling,
+extractive summary of that conversation (the question plus the opening of the
+answer), computed once when the turn is recorded, and the prompt context for
+the next follow-up is cached alongside it: the summary of earlier turns plus
+the last exchange.
+
+Conversations live in process memory, bounded by count and idle time. The
+first turn of a conversation carries an empty chat_history; a follow-up for a
+conversation this process does not have (after a restart, or on another
+worker) is refused by /api/ask so the client can resend its history.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+MAX_CONVERSATIONS = int(os.getenv("MAX_CONVERSATIONS", "10000"))
+CONVERSATION_TTL_SECONDS = float(os.getenv("CONVERSATION_TTL_SECONDS", "21600"))
+# Earlier turns kept in the summary, and the characters each may use.
+SUMMARY_TURNS = 6
+SUMMARY_GIST_CHARS = 240
+# The last answer is sent verbatim up to this length, as chat_history was.
+LAST_ANSWER_CHARS = 800
+
+HEADING_PAT = re.compile(r"^#+\s*(.*)$", re.MULTILINE)
+MARKUP_PAT = re.compile(r"[*_`>]+")
+SENTENCE_END_PAT = re.compile(r"(?<=[.!?])\s+")
+
+LOOKUPS = metrics.counter(
+    "sutra_conversation_lookups_total",
+    "conversation_id lookups (hit; miss for a new or lost conversation).",
+    labels=("outcome",),
+)
+
+
+def answer_gist(answer: str, max_chars: int = SUMMARY_GIST_CHARS) -> str:
+    """The first sentences of an answer's opening section, without markdown."""
+    sections = HEADING_PAT.split(answer)
+    # split() alternates body, heading, body, ...; take the first non-empty body.
+    bodies = [s for s in sections[::2] if s.strip()] or [answer]
+    text = " ".join(MARKUP_PAT.sub("", bodies[0]).split())
+    gist = ""
+    for sentence in SENTENCE_END_PAT.split(text):
+        if gist and len(gist) + len(sentence) + 1 > max_chars:
+            break
+        gist = f"{gist} {sentence}".strip()
+    if len(gist) > max_chars:
+        gist = gist[:max_chars].rsplit(" ", 1)[0] + "..."
+    return gist
+
+
+def format_conversation_context(summary: list[str], last_exchange: tuple[str, str] | None) -> str:
+    if not summary and not last_exchange:
+        return ""
+    parts = []
+    if summary:
+        parts.append("Earlier in this conversation:\n" + "\n".join(f"- {line}" for line in summary))
+    if last_exchange:
+        question, answer = last_exchange
+        if len(answer) > LAST_ANSWER_CHARS:
+            answer = answer[:LAST_ANSWER_CHARS] + "...[summary truncated]"
+        parts.append(f"User: {question}\n\nAssistant: {answer}")
+    return "CONVERSATION SO FAR:\n" + "\n\n".join(parts) + "\n\n"
+
+
+class ConversationStore:
+    """Rolling summaries by conversation ID, least recently used evicted first."""
+
+    def __init__(self, max_conversations: int = MAX_CONVERSATIONS, ttl: float = CONVERSATION_TTL_SECONDS):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def _get(self, conversation_id: str) -> dict | None:
+        entry = self._conversations.get(conversation_id)
+        if entry is not None and time.monotonic() - entry["updated"] > self.ttl:
+            del self._conversations[conversation_id]
+            entry = None
+        return entry
+
+    def context(self, conversation_id: str) -> str | None:
+        """Cached prompt context for the next follow-up; None if the conversation is unknown."""
+        with self._lock:
+            entry = self._get(conversation_id)
+        LOOKUPS.inc(outcome="miss" if entry is None else "hit")
+        return None if entry is None else entry["context"]
+
+    def record_turn(self, conversation_id: str, question: str, answer: str):
+        """Fold the previous exchange into the summary and make this one the last."""
+        with self._lock:
+            entry = self._get(conversation_id) or {"summary": [], "last": None, "turns": 0}
+            if entry["last"] is not None:
+                prev_question, prev_answer = entry["last"]
+                entry["summary"] = entry["summary"][-(SUMMARY_TURNS - 1):] + [
+                    f"Asked: {prev_question} | Answered: {answer_gist(prev_answer)}"
+                ]
+            entry["last"] = (question, answer)
+            entry["turns"] += 1
+            entry["updated"] = time.monotonic()
+            entry["context"] = format_conversation_context(entry["summary"], entry["last"])
+            self._conversations[conversation_id] = entry
+            self._conversations.move_to_end(conversation_id)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+
+    def seed(self, conversation_id: str, chat_history: list[dict]) -> str:
+        """
+        Start a conversation from a client-held chat history (user/assistant
+        pairs; empty for a new conversation) and return its prompt context.
+        """
+        with self._lock:
+            self._conversations.pop(conversation_id, None)
+        question = None
+        for msg in chat_history:
+            if msg["role"] == "user":
+                question = msg["content"]
+            elif question is not None:
+                self.record_turn(conversation_id, question, msg["content"])
+                question = None
+        with self._lock:
+            entry = self._get(conversation_id)
+        return "" if entry is None else entry["context"]
@@ -0,0 +1,223 @@
+"""
+Compact columnar corpus format for parsed scripture entries.
+
+A corpus file is a short header followed by self-contained row blocks, so it
+can be written and read as a stream. Within a block every repeated field
+(text name, section, chapter, verse, translator, tradition) is stored as u32
+codes into a string table that grows block by block, and translations are a
+length-prefixed text column. Blocks can optionally be zlib-compressed, which
+makes files ~3x smaller at the cost of load speed.
+
+    header:  MAGIC | u16 version | u16 flags
+    block:   u32 payload size | payload
+    payload: u32 rows | u32 new strings | string column
+             | u32 codes per categorical field | text column per text field
+    column:  u32 character lengths | u32 byte size | UTF-8 bytes
+
+Each text column is decoded with a single call and sliced by the lengths.
+"""
+
+import json
+import os
+import struct
+import sys
+import zlib
+from itertools import accumulate
+
+MAGIC = b"SUTRACRP"
+FORMAT_VERSION = 1
+FLAG_ZLIB = 1
+CORPUS_EXT = ".corpus"
+BLOCK_ROWS = 1024
+COMPRESS_LEVEL = 1
+
+CATEGORICAL_FIELDS = ("text_name", "section", "chapter", "verse", "translation_source", "tradition")
+TEXT_FIELDS = ("translation",)
+FIELDS = ("text_name", "section", "chapter", "verse", "translation", "translation_source", "tradition")
+
+_HEADER = struct.Struct("<8sHH")
+_U32 = struct.Struct("<I")
+
+
+def _pack_texts(values: list[str]) -> bytes:
+    data = "".join(values).encode("utf-8")
+    lengths = struct.pack(f"<{len(values)}I", *map(len, values))
+    return lengths + _U32.pack(len(data)) + data
+
+
+def _unpack_texts(buf: bytes, offset: int, count: int) -> tuple[list[str], int]:
+    lengths = struct.unpack_from(f"<{count}I", buf, offset)
+    offset += 4 * count
+    (size,) = _U32.unpack_from(buf, offset)
+    offset += 4
+    column = buf[offset : offset + size].decode("utf-8")
+    ends = list(accumulate(lengths))
+    starts = [0] + ends[:-1]
+    return [column[s:e] for s, e in zip(starts, ends)], offset + size
+
+
+class CorpusWriter:
+    """Streams entries into a corpus file, one block of BLOCK_ROWS at a time."""
+
+    def __init__(self, path: str, compress: bool = False, block_rows: int = BLOCK_ROWS):
+        self.path = path
+        self.compress = compress
+        self.block_rows = block_rows
+        self.rows_written = 0
+        self._strings: dict[str, int] = {}
+        self._pending: list[dict] = []
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_ZLIB if compress else 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, entry: dict):
+        self._pending.append(entry)
+        if len(self._pending) >= self.block_rows:
+            self._write_block()
+
+    def write_many(self, entries):
+        for entry in entries:
+            self.write(entry)
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._pending:
+            self._write_block()
+        self._file.close()
+
+    def _write_block(self):
+        rows = self._pending
+        self._pending = []
+
+        new_strings = []
+        codes = {}
+        for field in CATEGORICAL_FIELDS:
+            column = []
+            for e in rows:
+                value = e.get(field, "")
+                code = self._strings.get(value)
+                if code is None:
+                    code = self._strings[value] = len(self._strings)
+                    new_strings.append(value)
+                column.append(code)
+            codes[field] = column
+
+        parts = [_U32.pack(len(rows)), _U32.pack(len(new_strings)), _pack_texts(new_strings)]
+        for field in CATEGORICAL_FIELDS:
+            parts.append(struct.pack(f"<{len(rows)}I", *codes[field]))
+        for field in TEXT_FIELDS:
+            parts.append(_pack_texts([e.get(field, "") for e in rows]))
+
+        payload = b"".join(parts)
+        if self.compress:
+            payload = zlib.compress(payload, COMPRESS_LEVEL)
+        self._file.write(_U32.pack(len(payload)))
+        self._file.write(payload)
+        self.rows_written += len(rows)
+
+
+class CorpusReader:
+    """Streams a corpus file back as column blocks or as entry dicts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, flags = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a corpus file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses corpus format v{version}; this reader supports v{FORMAT_VERSION}")
+        self.version = version
+        self.compressed = bool(flags & FLAG_ZLIB)
+
+    def blocks(self):
+        """Yield one dict of field -> list of values per block."""
+        strings: list[str] = []
+        with open(self.path, "rb") as f:
+            f.seek(_HEADER.size)
+            while True:
+                size_bytes = f.read(4)
+                if not size_bytes:
+                    break
+                (size,) = _U32.unpack(size_bytes)
+                payload = f.read(size)
+                if len(payload) != size:
+                    raise ValueError(f"{self.path} is truncated")
+                if self.compressed:
+                    payload = zlib.decompress(payload)
+                yield self._decode_block(payload, strings)
+
+    def _decode_block(self, payload: bytes, strings: list[str]) -> dict[str, list]:
+        (rows,) = _U32.unpack_from(payload, 0)
+        (n_new,) = _U32.unpack_from(payload, 4)
+        new_strings, offset = _unpack_texts(payload, 8, n_new)
+        strings.extend(new_strings)
+
+        columns = {}
+        for field in CATEGORICAL_FIELDS:
+            codes = struct.unpack_from(f"<{rows}I", payload, offset)
+            offset += 4 * rows
+            columns[field] = [strings[c] for c in codes]
+        for field in TEXT_FIELDS:
+            columns[field], offset = _unpack_texts(payload, offset, rows)
+        return columns
+
+    def __iter__(self):
+        for columns in self.blocks():
+            for values in zip(*(columns[field] for field in FIELDS)):
+                yield dict(zip(FIELDS, values))
+
+
+def write_corpus(path: str, entries: list[dict], compress: bool = False) -> int:
+    with CorpusWriter(path, compress=compress) as writer:
+        writer.write_many(entries)
+    return writer.rows_written
+
+
+def read_corpus(path: str) -> list[dict]:
+    return list(CorpusReader(path))
+
+
+def load_corpus(path: str) -> list[dict]:
+    """Load a corpus file, accepting legacy JSON corpora by extension."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return read_corpus(path)
+
+
+def export_json(src: str, dst: str | None = None) -> str:
+    """Write a corpus file out as indented JSON for inspection."""
+    dst = dst or os.path.splitext(src)[0] + ".json"
+    with open(dst, "w", encoding="utf-8") as f:
+        json.dump(read_corpus(src), f, ensure_ascii=False, indent=2)
+    return dst
+
+
+def main():
+    usage = (
+        "usage: python corpus_format.py export <file.corpus> [out.json]\n"
+        "       python corpus_format.py convert <file.json> [out.corpus] [--compress]"
+    )
+    args = [a for a in sys.argv[1:] if a != "--compress"]
+    if len(args) < 2 or args[0] not in ("export", "convert"):
+        print(usage)
+        sys.exit(1)
+
+    command, src = args[0], args[1]
+    if command == "export":
+        dst = export_json(src, args[2] if len(args) > 2 else None)
+    else:
+        dst = args[2] if len(args) > 2 else os.path.splitext(src)[0] + CORPUS_EXT
+        write_corpus(dst, load_corpus(src), compress="--compress" in sys.argv)
+    print(f"{src} ({os.path.getsize(src) / 1024:.0f} KB) -> {dst} ({os.path.getsize(dst) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Near-duplicate collapse for store builds.
+
+Parsed corpora still contain repeated passages, table-of-contents leftovers and
+running headers that would otherwise be embedded and searched as separate
+documents. Two passes, both within one group only (the store groups by text
+and section):
+
+    exact   identical translations after lowercasing and dropping punctuation;
+            removed before embedding, so they cost no embedding calls.
+    near    pairs whose embeddings score at least DEDUP_COSINE (found with
+            blocked matrix products) and whose word shingles overlap by at
+            least DEDUP_JACCARD.
+
+Each group of duplicates keeps its first document; the others become aliases
+of it. The returned report lists every removed document and why.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+DEDUP_COSINE = float(os.getenv("DEDUP_COSINE", "0.95"))
+DEDUP_JACCARD = float(os.getenv("DEDUP_JACCARD", "0.8"))
+SHINGLE_WORDS = 5
+# Score pairs in blocks of at most this many, as in vector_store.
+BLOCK_ELEMENTS = 4_000_000
+
+WORD_PAT = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(WORD_PAT.findall(text.lower()))
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set[tuple[str, ...]]:
+    words = normalize(text).split()
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def exact_duplicates(texts: list[str], groups: list[str]) -> dict[int, int]:
+    """Index of each exact duplicate -> index of the first copy in its group."""
+    first: dict[tuple[str, str], int] = {}
+    duplicates = {}
+    for i, (text, group) in enumerate(zip(texts, groups)):
+        kept = first.setdefault((group, normalize(text)), i)
+        if kept != i:
+            duplicates[i] = kept
+    return duplicates
+
+
+def near_duplicates(
+    embeddings: np.ndarray,
+    texts: list[str],
+    groups: list[str],
+    cosine: float = DEDUP_COSINE,
+    min_jaccard: float = DEDUP_JACCARD,
+) -> dict[int, tuple[int, float, float]]:
+    """
+    Index of each near duplicate -> (index kept, cosine, shingle Jaccard).
+    Groups of mutually similar documents collapse into their first member.
+    """
+    n = len(texts)
+    if n == 0:
+        return {}
+    _, group_codes = np.unique(np.array(groups), return_inverse=True)
+    unit = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+    shingle_sets: dict[int, set] = {}
+    parent = np.arange(n)
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    block = max(1, BLOCK_ELEMENTS // n)
+    for start in range(0, n, block):
+        rows = np.arange(start, min(start + block, n))
+        scores = unit[rows] @ unit.T
+        # Each pair once (j > i), within one group, above the cosine threshold.
+        candidates = (scores >= cosine) & (np.arange(n)[None, :] > rows[:, None])
+        candidates &= group_codes[rows][:, None] == group_codes[None, :]
+        for r, j in zip(*np.nonzero(candidates)):
+            i = int(rows[r])
+            j = int(j)
+            for k in (i, j):
+                if k not in shingle_sets:
+                    shingle_sets[k] = shingles(texts[k])
+            overlap = jaccard(shingle_sets[i], shingle_sets[j])
+            if overlap < min_jaccard:
+                continue
+            ri, rj = root(i), root(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    duplicates = {}
+    for i in range(n):
+        kept = int(root(i))
+        if kept != i:
+            # Chains (a~b, b~c) collapse too; report similarity to the kept document.
+            duplicates[i] = (kept, float(unit[i] @ unit[kept]), jaccard(shingle_sets[i], shingle_sets[kept]))
+    return duplicates
+
+
+def write_report(report: list[dict], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Wrote duplicate report ({len(report)} removed) to {path}")
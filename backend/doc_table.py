@@ -0,0 +1,192 @@
+"""
+Columnar document table backing the vector store.
+
+Repeated metadata (text name, section, chapter, verse, translator, tradition)
+is interned once per column and stored as integer codes; all translations live
+in a single UTF-8 buffer addressed by byte offsets. Rows are materialized lazily
+through DocumentRow views, which behave like the per-document dicts the store
+used to keep, including the "id" and derived "doc_text" keys.
+
+Document IDs are text, section, chapter and verse; the few passages that
+share all four (a parser that could not tell two passages apart) get an
+occurrence suffix, so every row has its own ID. IDs are assigned before
+deduplication and stored with the table, so the IDs of collapsed duplicates
+still name the passages they were built from.
+"""
+
+import re
+from collections.abc import Mapping
+
+import numpy as np
+
+CATEGORICAL_FIELDS = ("text_name", "section", "chapter", "verse", "translation_source", "tradition")
+ROW_FIELDS = ("id", "text_name", "section", "chapter", "verse", "translation",
+              "translation_source", "tradition", "doc_text")
+
+
+def build_doc_id(entry) -> str:
+    """The base ID of a passage; assign_doc_ids() makes it unique."""
+    parts = [entry["text_name"].lower().replace(" ", "_")]
+    if entry.get("section"):
+        parts.append(re.sub(r"[^0-9a-z]+", "_", entry["section"].lower()).strip("_"))
+    parts += [entry["chapter"], entry["verse"]]
+    return "_".join(parts)
+
+
+def assign_doc_ids(entries) -> list[str]:
+    """Unique IDs for entries, in order: repeats of a base ID get "~2", "~3", ..."""
+    ids = []
+    seen: set[str] = set()
+    for entry in entries:
+        base = doc_id = build_doc_id(entry)
+        n = 1
+        while doc_id in seen:
+            n += 1
+            doc_id = f"{base}~{n}"
+        seen.add(doc_id)
+        ids.append(doc_id)
+    return ids
+
+
+def build_doc_text(entry) -> str:
+    parts = [
+        f"{entry['text_name']}",
+    ]
+    if entry.get("section"):
+        parts.append(f"Section: {entry['section']}")
+    parts.append(f"Chapter {entry['chapter']}, Verse {entry['verse']}")
+    parts.append(f"Translation: {entry['translation']}")
+    return ". ".join(parts)
+
+
+class DocumentRow(Mapping):
+    """Read-only dict-like view of one table row."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "DocumentTable", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str):
+        table = self._table
+        if key in table.codes:
+            return table.categories[key][table.codes[key][self._index]]
+        if key == "translation":
+            return table.translation(self._index)
+        if key == "id":
+            return table.ids[self._index]
+        if key == "doc_text":
+            return build_doc_text(self)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(ROW_FIELDS)
+
+    def __len__(self) -> int:
+        return len(ROW_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"DocumentRow({self._index}, {self.to_dict()!r})"
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    def to_dict(self) -> dict:
+        table, i = self._table, self._index
+        row = {field: table.categories[field][int(table.codes[field][i])] for field in CATEGORICAL_FIELDS}
+        row["translation"] = table.translation(i)
+        row["id"] = table.ids[i]
+        row["doc_text"] = build_doc_text(row)
+        return {key: row[key] for key in ROW_FIELDS}
+
+    copy = to_dict
+
+
+class DocumentTable:
+    def __init__(self):
+        self.categories: dict[str, list[str]] = {f: [] for f in CATEGORICAL_FIELDS}
+        self.codes: dict[str, np.ndarray] = {f: np.zeros(0, dtype=np.uint32) for f in CATEGORICAL_FIELDS}
+        self.text = b""
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.ids: list[str] = []
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if "ids" not in state:
+            # Tables pickled before IDs were stored derive them from the columns.
+            self.ids = assign_doc_ids(self._id_fields())
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "DocumentTable":
+        table = cls()
+        for field in CATEGORICAL_FIELDS:
+            lookup: dict[str, int] = {}
+            values = table.categories[field]
+            codes = np.empty(len(records), dtype=np.uint32)
+            for i, r in enumerate(records):
+                value = r.get(field, "")
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(values)
+                    values.append(value)
+                codes[i] = code
+            table.codes[field] = codes
+
+        translations = [r["translation"].encode("utf-8") for r in records]
+        table.text = b"".join(translations)
+        lengths = np.fromiter(map(len, translations), dtype=np.int64, count=len(translations))
+        table.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        if all("id" in r for r in records):
+            table.ids = [r["id"] for r in records]
+        else:
+            table.ids = assign_doc_ids(records)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> DocumentRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return DocumentRow(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield DocumentRow(self, i)
+
+    def translation(self, index: int) -> str:
+        return self.text[self.offsets[index] : self.offsets[index + 1]].decode("utf-8")
+
+    def column(self, field: str) -> list[str]:
+        if field == "translation":
+            return [self.translation(i) for i in range(len(self))]
+        categories = self.categories[field]
+        return [categories[c] for c in self.codes[field]]
+
+    def column_ids(self) -> list[str]:
+        """The "id" of every row."""
+        return list(self.ids)
+
+    def _id_fields(self) -> list[dict]:
+        fields = ("text_name", "section", "chapter", "verse")
+        columns = [self.column(field) for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def counts(self, field: str) -> dict[str, int]:
+        """Rows per distinct value of a categorical column, in first-seen order."""
+        totals = np.bincount(self.codes[field], minlength=len(self.categories[field]))
+        return {value: int(n) for value, n in zip(self.categories[field], totals) if n}
+
+    def indices(self, field: str, value: str) -> np.ndarray:
+        try:
+            code = self.categories[field].index(value)
+        except ValueError:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.codes[field] == code)
+
+    def records(self) -> list[dict]:
+        return [row.to_dict() for row in self]
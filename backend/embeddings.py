@@ -0,0 +1,214 @@
+"""
+Embedding providers for the vector store.
+
+A provider turns texts into float32 vectors and describes itself with a small
+manifest (provider, model, dimensions) that is saved alongside the store, so a
+loaded store always embeds queries the same way its documents were embedded.
+
+    gemini  Google's embedding API; needs network access and GOOGLE_API_KEY.
+    local   TF-IDF weighted words, signed-hashed into a fixed number of
+            dimensions. The IDF weights are fitted when the store is built and
+            saved with it; embedding runs on the CPU with no network.
+
+The provider used to build a store is chosen with EMBEDDING_PROVIDER.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from genai_client import EMBED_TIMEOUT, call_options, get_client, types
+
+EMBEDDING_MODEL = "gemini-embedding-001"
+EMBED_BATCH_SIZE = 50
+# Pause between bulk embedding batches to stay under the API rate limit.
+EMBED_BATCH_PAUSE = 0.5
+
+LOCAL_MODEL = "hashed-tfidf"
+# Hashing words straight into the output dimensions kept recall on the golden
+# set well above hashing into a wide space and randomly projecting down.
+LOCAL_DIMS = 1024
+
+
+class GeminiEmbeddings:
+    name = "gemini"
+    # Default relevance cutoff for retrieved passages (cosine score).
+    min_score = 0.3
+
+    def __init__(self, client=None, api_key: str | None = None, model: str = EMBEDDING_MODEL):
+        if client is None and not (api_key or os.getenv("GOOGLE_API_KEY")):
+            raise ValueError("GOOGLE_API_KEY is required")
+        self._client = client
+        self._api_key = api_key
+        self.model = model
+        self.batch_pause = EMBED_BATCH_PAUSE
+        # Set by the first embedding call, or from the manifest of a loaded store.
+        self.dims: int | None = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client(self._api_key)
+        return self._client
+
+    def manifest(self) -> dict:
+        return {"provider": self.name, "model": self.model, "dims": self.dims}
+
+    def fit(self, texts: list[str]):
+        pass
+
+    def state(self):
+        return None
+
+    def load_state(self, state):
+        pass
+
+    def embed(self, texts: list[str], paced: bool = False) -> np.ndarray:
+        """Embed texts in API batches; paced=True waits between batches (bulk indexing)."""
+        config = types().EmbedContentConfig(http_options=call_options(EMBED_TIMEOUT))
+        all_embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[i : i + EMBED_BATCH_SIZE]
+            for attempt in range(5):
+                try:
+                    result = self.client.models.embed_content(
+                        model=self.model,
+                        contents=batch,
+                        config=config,
+                    )
+                    for emb in result.embeddings:
+                        all_embeddings.append(emb.values)
+                    break
+                except Exception as e:
+                    if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
+                        wait = 2 ** attempt * 5
+                        print(f"    Rate limited, waiting {wait}s...")
+                        time.sleep(wait)
+                    else:
+                        raise
+            if (i // EMBED_BATCH_SIZE) % 20 == 0 and i > 0:
+                print(f"    Embedded {i + len(batch)}/{len(texts)}...")
+            # Pace bulk embedding between batches only; queries must not wait.
+            if paced and i + EMBED_BATCH_SIZE < len(texts) and self.batch_pause:
+                time.sleep(self.batch_pause)
+        embeddings = np.array(all_embeddings, dtype=np.float32)
+        if embeddings.ndim == 2:
+            self.dims = embeddings.shape[1]
+        return embeddings
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        """
+        embed() for queries on the event loop, so the call can be cancelled.
+        Rate limits are raised to the caller rather than waited out.
+        """
+        config = types().EmbedContentConfig(http_options=call_options(EMBED_TIMEOUT))
+        all_embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            result = await self.client.aio.models.embed_content(
+                model=self.model,
+                contents=texts[i : i + EMBED_BATCH_SIZE],
+                config=config,
+            )
+            all_embeddings.extend(emb.values for emb in result.embeddings)
+        embeddings = np.array(all_embeddings, dtype=np.float32)
+        if embeddings.ndim == 2:
+            self.dims = embeddings.shape[1]
+        return embeddings
+
+
+class LocalEmbeddings:
+    name = "local"
+    # Word-overlap cosine scores run much lower than semantic ones.
+    min_score = 0.1
+
+    def __init__(self, dims: int = LOCAL_DIMS):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.model = LOCAL_MODEL
+        self.dims = dims
+        self.vectorizer = HashingVectorizer(
+            n_features=dims,
+            strip_accents="unicode",
+            alternate_sign=True,
+            norm=None,
+        )
+        self.idf: np.ndarray | None = None
+
+    def manifest(self) -> dict:
+        return {"provider": self.name, "model": self.model, "dims": self.dims}
+
+    def _counts(self, texts: list[str]):
+        counts = self.vectorizer.transform(texts).astype(np.float32)
+        # Colliding words with opposite signs cancel out.
+        counts.eliminate_zeros()
+        return counts
+
+    def fit(self, texts: list[str]):
+        df = np.bincount(self._counts(texts).indices, minlength=self.dims)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+    def state(self) -> dict:
+        return {"idf": self.idf}
+
+    def load_state(self, state: dict | None):
+        if not state or state.get("idf") is None:
+            raise ValueError("local embedding store is missing its fitted IDF weights")
+        self.idf = state["idf"]
+
+    def embed(self, texts: list[str], paced: bool = False) -> np.ndarray:
+        # Runs locally; there is no rate limit to pace for.
+        if self.idf is None:
+            raise RuntimeError("local embeddings are not fitted; build the store first")
+        tf = self._counts(texts)
+        tf.data = np.sign(tf.data) * (1 + np.log(np.abs(tf.data)))
+        dense = tf.multiply(self.idf).toarray().astype(np.float32)
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        return dense / np.where(norms == 0, 1, norms)
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        # A query takes well under a millisecond on the CPU; no thread needed.
+        return self.embed(texts)
+
+
+PROVIDERS = {"gemini": GeminiEmbeddings, "local": LocalEmbeddings}
+
+
+def make_provider(name: str | None = None, client=None, api_key: str | None = None):
+    """Provider for building a new store; defaults to EMBEDDING_PROVIDER, then gemini."""
+    name = name or os.getenv("EMBEDDING_PROVIDER", "gemini")
+    if name == "gemini":
+        return GeminiEmbeddings(client=client, api_key=api_key)
+    if name == "local":
+        return LocalEmbeddings()
+    raise ValueError(f"Unknown embedding provider {name!r}; expected one of {', '.join(PROVIDERS)}")
+
+
+def legacy_manifest(embeddings: np.ndarray | None) -> dict:
+    """Stores saved before manifests existed were all built with Gemini."""
+    dims = int(embeddings.shape[1]) if embeddings is not None and embeddings.ndim == 2 else None
+    return {"provider": "gemini", "model": EMBEDDING_MODEL, "dims": dims}
+
+
+def provider_from_manifest(manifest: dict, state=None, client=None, api_key: str | None = None):
+    """Recreate the provider that built a store."""
+    if manifest["provider"] == "gemini":
+        provider = GeminiEmbeddings(client=client, api_key=api_key, model=manifest["model"])
+        provider.dims = manifest["dims"]
+    elif manifest["provider"] == "local":
+        provider = LocalEmbeddings(manifest["dims"])
+        provider.load_state(state)
+    else:
+        raise ValueError(f"Unknown embedding provider {manifest['provider']!r} in store manifest")
+    return provider
+
+
+def check_compatible(provider, manifest: dict):
+    """Raise if `provider` would embed queries differently from the store's documents."""
+    current = provider.manifest()
+    for key, value in manifest.items():
+        if current.get(key) is not None and value is not None and current[key] != value:
+            raise ValueError(
+                f"Store was embedded with {manifest}, but queries would use {current}. "
+                "Load it with MultiCorpusVectorStore.from_file() to use the matching provider."
+            )
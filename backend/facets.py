@@ -0,0 +1,83 @@
+"""
+Facet index for filtering searches by tradition, text, section and chapter.
+
+Built once per loaded store from the document table's category codes: for each
+facet field, the rows sorted by value, so every value's rows are a sorted slice
+(its posting list). A facet filter maps field -> accepted values; values of one
+field are ORed and fields are ANDed, e.g.
+
+    {"tradition": ["Vedic"], "section": ["Katha Upanishad"]}
+
+Values match case-insensitively. Sections also match by prefix at a word
+boundary ("Katha Upanishad" matches "Katha Upanishad, Part One, Chapter I";
+"Book I" does not match "Book II"). Filters resolve to sorted row indices by
+merging posting lists, so a narrow scope costs time in proportion to its size
+and the search only scores those rows. Values are looked up in a dict built
+with the index, and section prefixes by binary search over the sorted values,
+so a filter costs nothing per distinct value in the store.
+"""
+
+import numpy as np
+
+FACET_FIELDS = ("text_name", "tradition", "section", "chapter")
+PREFIX_FIELDS = ("section",)
+# Sorts after every character, so [w, w + PREFIX_END) holds the values starting with w.
+PREFIX_END = "\U0010ffff"
+
+
+class FacetIndex:
+    def __init__(self, table):
+        self.size = len(table)
+        # Casefolded value -> its category codes (values differing only in case share a key).
+        self.codes: dict[str, dict[str, list[int]]] = {}
+        # Prefix fields: the distinct casefolded values, sorted.
+        self.sorted_values: dict[str, np.ndarray] = {}
+        self.rows: dict[str, np.ndarray] = {}
+        self.bounds: dict[str, np.ndarray] = {}
+        for field in FACET_FIELDS:
+            codes = table.codes[field]
+            rows = np.argsort(codes, kind="stable")
+            by_value: dict[str, list[int]] = {}
+            for code, value in enumerate(table.categories[field]):
+                by_value.setdefault(value.casefold(), []).append(code)
+            self.codes[field] = by_value
+            if field in PREFIX_FIELDS:
+                self.sorted_values[field] = np.array(sorted(by_value), dtype=str)
+            self.rows[field] = rows
+            self.bounds[field] = np.searchsorted(codes[rows], np.arange(len(table.categories[field]) + 1))
+
+    def _value_codes(self, field: str, wanted: str) -> list[int]:
+        by_value = self.codes[field]
+        if field not in PREFIX_FIELDS:
+            return by_value.get(wanted, [])
+        values = self.sorted_values[field]
+        lo, hi = np.searchsorted(values, [wanted, wanted + PREFIX_END])
+        # Only a prefix at a word boundary: "Book I" is not "Book II".
+        return [
+            code
+            for value in values[lo:hi]
+            if len(value) == len(wanted) or not value[len(wanted)].isalnum()
+            for code in by_value[value]
+        ]
+
+    def value_rows(self, field: str, values: list[str]) -> np.ndarray:
+        """Sorted rows whose `field` matches any of `values`."""
+        if field not in self.rows:
+            raise ValueError(f"Unknown facet {field!r}; expected one of {', '.join(FACET_FIELDS)}")
+        wanted = {w for w in (v.casefold().strip() for v in values) if w}
+        codes = sorted({code for w in wanted for code in self._value_codes(field, w)})
+        rows, bounds = self.rows[field], self.bounds[field]
+        parts = [rows[bounds[code] : bounds[code + 1]] for code in codes]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def select(self, facets: dict[str, list[str]], within: np.ndarray | None = None) -> np.ndarray:
+        """Sorted rows matching every field of `facets` (and in `within`, if given)."""
+        selected = within
+        # Smallest posting lists first keeps the intersections short.
+        for rows in sorted((self.value_rows(f, v) for f, v in facets.items() if v), key=len):
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+            if len(selected) == 0:
+                break
+        return np.arange(self.size) if selected is None else selected
@@ -0,0 +1,110 @@
+"""
+Shared google-genai client, built on first use.
+
+Importing google.genai costs over a second, so nothing imports it at module
+level; the first caller pays for the import and the client, and every later
+caller in the process (embeddings, generation, reloaded stores) reuses it.
+
+The client owns one httpx connection pool per process (sync and async), sized
+and kept alive through the settings below, with transient-error retries and
+per-call timeouts. HTTP/2 is used when the h2 package is installed.
+GEMINI_BASE_URL points the client at another endpoint, such as the local
+stand-in in benchmarks/standin.py.
+"""
+
+import importlib.util
+import os
+import threading
+
+POOL_SIZE = int(os.getenv("GENAI_POOL_SIZE", "32"))
+# httpx closes idle connections after 5s by default; keep them for bursty traffic.
+KEEPALIVE_SECONDS = float(os.getenv("GENAI_KEEPALIVE_SECONDS", "120"))
+CONNECT_TIMEOUT = float(os.getenv("GENAI_CONNECT_TIMEOUT", "5"))
+EMBED_TIMEOUT = float(os.getenv("GENAI_EMBED_TIMEOUT", "15"))
+GENERATE_TIMEOUT = float(os.getenv("GENAI_GENERATE_TIMEOUT", "90"))
+RETRY_ATTEMPTS = int(os.getenv("GENAI_RETRY_ATTEMPTS", "3"))
+# Transient failures only: quota errors (429) are left to callers, which know
+# whether waiting makes sense (bulk indexing) or not (a user's question).
+RETRY_STATUS_CODES = (408, 500, 502, 503, 504)
+# "auto" enables HTTP/2 when h2 is importable; "1" / "0" force it on / off.
+HTTP2 = os.getenv("GENAI_HTTP2", "auto")
+BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+_clients: dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def http2_enabled() -> bool:
+    if HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return HTTP2 == "1"
+
+
+def http_options(
+    pool_size: int = POOL_SIZE,
+    keepalive: float = KEEPALIVE_SECONDS,
+    base_url: str | None = BASE_URL,
+    http2: bool | None = None,
+):
+    """Client-wide HttpOptions: shared pools, connect timeout, retries."""
+    import httpx
+
+    t = types()
+    http2 = http2_enabled() if http2 is None else http2
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive,
+    )
+    # Read timeouts are set per call (embed vs generate); this is the ceiling.
+    timeout = httpx.Timeout(max(EMBED_TIMEOUT, GENERATE_TIMEOUT), connect=CONNECT_TIMEOUT)
+    return t.HttpOptions(
+        base_url=base_url,
+        httpx_client=httpx.Client(limits=limits, timeout=timeout, http2=http2),
+        httpx_async_client=httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2),
+        retry_options=t.HttpRetryOptions(
+            attempts=RETRY_ATTEMPTS,
+            http_status_codes=list(RETRY_STATUS_CODES),
+        ),
+    )
+
+
+def call_options(timeout: float):
+    """Per-call HttpOptions with a timeout in seconds, for EmbedContentConfig etc."""
+    return types().HttpOptions(timeout=int(timeout * 1000))
+
+
+def build_client(api_key: str, **options):
+    """A new client with its own pools; get_client() is the shared one."""
+    from google import genai
+
+    return genai.Client(api_key=api_key, http_options=http_options(**options))
+
+
+def get_client(api_key: str | None = None):
+    key = api_key or os.getenv("GOOGLE_API_KEY")
+    if not key:
+        raise ValueError("GOOGLE_API_KEY is required")
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = build_client(key)
+    return client
+
+
+def set_client(client, api_key: str | None = None):
+    """Register `client` (e.g. a local stand-in) as the shared client for a key."""
+    key = api_key or os.getenv("GOOGLE_API_KEY")
+    if not key:
+        raise ValueError("GOOGLE_API_KEY is required")
+    with _lock:
+        _clients[key] = client
+
+
+def types():
+    """The google.genai.types module, imported on first use."""
+    from google.genai import types
+
+    return types
@@ -0,0 +1,136 @@
+"""
+Hedged generation requests.
+
+A generate_content call that is much slower than usual is usually slow
+because of where it landed, not what it asked, so an identical second request
+sent once the first is overdue tends to finish sooner. HedgePolicy keeps the
+latencies of recent calls; when a call has not returned by HEDGE_PERCENTILE of
+them, it sends a hedge, uses whichever request succeeds first and cancels the
+other.
+
+Hedges are capped at HEDGE_MAX_RATE of calls by a token bucket: every call
+earns HEDGE_MAX_RATE of a token and every hedge spends one, so a slow upstream
+sees at most that much extra load. A hedge also needs a free slot of its own
+at the admission gate it runs under (never waiting for one), so hedging does
+not push concurrency past the gate's limit. Nothing is hedged until
+HEDGE_MIN_SAMPLES latencies have been seen. Hedging is off unless
+HEDGE_ENABLED=1.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+import metrics
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.05"))
+HEDGE_WINDOW = 500
+HEDGE_MIN_SAMPLES = 20
+# Tokens a quiet spell can bank, which bounds a burst of hedges.
+HEDGE_BURST = 10.0
+
+HEDGES = metrics.counter(
+    "sutra_generation_hedges_total",
+    "Generation calls still running at the hedge delay, by outcome (sent, throttled, no_slot).",
+    labels=("outcome",),
+)
+HEDGE_WINS = metrics.counter(
+    "sutra_generation_hedge_wins_total",
+    "Hedged generations by the request that answered first (primary, hedge).",
+    labels=("winner",),
+)
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        percentile: float = HEDGE_PERCENTILE,
+        max_rate: float = HEDGE_MAX_RATE,
+        window: int = HEDGE_WINDOW,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float | None:
+        """Seconds to wait before hedging; None until enough latencies are known."""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            return float(np.percentile(self.latencies, self.percentile))
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def _earn(self):
+        with self._lock:
+            self.tokens = min(self.tokens + self.max_rate, HEDGE_BURST)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+    async def run(self, call: Callable[[], Awaitable], gate=None):
+        """
+        Await call(), hedged by a second call() if the first is overdue.
+        gate: the admission StageGate the primary holds a slot of; the hedge
+        takes another with try_acquire() and is skipped if none is free.
+        """
+        self._earn()
+        delay = self.delay()
+        started: dict[asyncio.Future, float] = {}
+
+        def launch() -> asyncio.Future:
+            task = asyncio.ensure_future(call())
+            started[task] = time.monotonic()
+            return task
+
+        primary = launch()
+        pending = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    if gate is not None and not gate.try_acquire():
+                        HEDGES.inc(outcome="no_slot")
+                    elif self._spend():
+                        HEDGES.inc(outcome="sent")
+                        hedge = launch()
+                        if gate is not None:
+                            hedge.add_done_callback(lambda task: gate.release(time.monotonic() - started[task]))
+                        pending.add(hedge)
+                    else:
+                        if gate is not None:
+                            gate.release()
+                        HEDGES.inc(outcome="throttled")
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        # The other request may still succeed.
+                        error = task.exception()
+                        continue
+                    self.record(time.monotonic() - started[task])
+                    if len(started) > 1:
+                        HEDGE_WINS.inc(winner="primary" if task is primary else "hedge")
+                    return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
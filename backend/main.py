@@ -3,22 +3,154 @@ FastAPI server for the multi-text Indian scripture RAG platform.
 Supports single-text queries and cross-text comparison.
 """
 
+import asyncio
+import hmac
+import json
 import os
+import time
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
 load_dotenv()
 
-from rag import ScriptureRAG
-from vector_store import MultiCorpusVectorStore
+import genai_client
+import metrics
+from admission import Overloaded
+from conversations import ConversationStore
+
+# The RAG pipeline (google.genai, numpy, the store) is imported and loaded by
+# load_pipeline(), so importing this module stays cheap and /api/health
+# answers as soon as the server is up.
+
+STORE_PATH = os.getenv("VECTOR_STORE_PATH", "vector_store_multi.pkl")
+# "background" starts serving at once and loads the store in a thread;
+# "eager" loads it before the server accepts requests.
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background")
+# Admin endpoints are disabled unless a token is configured.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Seconds between checks of the store file for changes; 0 disables watching.
+STORE_WATCH_INTERVAL = float(os.getenv("STORE_WATCH_INTERVAL", "0"))
+
+# Questions per /api/ask/batch request, and generations running at once
+# across all batch requests.
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Retry-After (seconds) sent with a 429 when Gemini reports its quota exhausted.
+QUOTA_RETRY_AFTER = int(os.getenv("QUOTA_RETRY_AFTER", "10"))
+# Seconds between checks for a client that has gone away mid-question.
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+
+STARTUP_SECONDS = metrics.histogram(
+    "sutra_startup_seconds",
+    "Time spent in each startup phase (import, load_store, client).",
+    labels=("phase",),
+)
+
+# Set by load_pipeline(). Always read the store through rag.store: reloads
+# swap it in place.
+rag = None
+reloader = None
+startup = {"state": "loading", "error": None, "seconds": {}}
+conversation_store = ConversationStore()
+# Batch items generating (or waiting for a generation slot) at once, so a large
+# batch does not fill the admission queue that /api/ask shares. Created on the
+# serving event loop by lifespan().
+batch_slots: asyncio.Semaphore | None = None
+
+DISCONNECTS = metrics.counter(
+    "sutra_client_disconnects_total",
+    "Questions abandoned by the client before the answer was ready; their work is cancelled.",
+)
+BATCH_ITEMS = metrics.counter(
+    "sutra_batch_items_total",
+    "Items of /api/ask/batch requests by outcome (ok, error).",
+    labels=("outcome",),
+)
+
+
+def _phase_done(name: str, start: float) -> float:
+    elapsed = time.perf_counter() - start
+    startup["seconds"][name] = round(elapsed, 3)
+    STARTUP_SECONDS.observe(elapsed, phase=name)
+    return time.perf_counter()
+
+
+def load_pipeline():
+    """Import the pipeline, load the store and build the shared client. Blocking."""
+    global rag, reloader
+    try:
+        start = time.perf_counter()
+        from rag import ScriptureRAG
+        from store_reloader import StoreReloader
+        from vector_store import MultiCorpusVectorStore
+        start = _phase_done("import", start)
+
+        # The store's manifest decides how queries are embedded (Gemini or local).
+        pipeline = ScriptureRAG(MultiCorpusVectorStore.from_file(STORE_PATH))
+        start = _phase_done("load_store", start)
+
+        reloader = StoreReloader(pipeline, STORE_PATH)
+        rag = pipeline
+        startup["state"] = "ready"
+    except Exception as e:
+        startup["state"] = "failed"
+        startup["error"] = f"{type(e).__name__}: {e}"
+        print(f"Startup failed: {startup['error']}")
+        return
+
+    # Already serving; build the shared client and import google.genai (over a
+    # second) now rather than during the first question.
+    try:
+        if os.getenv("GOOGLE_API_KEY"):
+            pipeline.client  # noqa: B018
+            genai_client.types()
+        _phase_done("client", start)
+    except Exception as e:
+        print(f"Could not build the Gemini client yet: {e}")
+    print(f"Startup: {startup['seconds']}")
+
+
+def ready_rag():
+    """The loaded pipeline, or 503 while the store is loading (or failed to load)."""
+    if rag is None:
+        if startup["state"] == "failed":
+            detail = f"Vector store failed to load: {startup['error']}"
+        else:
+            detail = "Service is starting; the vector store is still loading"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+    return rag
+
+
+async def run_startup():
+    if rag is None:
+        await asyncio.to_thread(load_pipeline)
+    if STORE_WATCH_INTERVAL > 0 and reloader is not None:
+        await reloader.watch(STORE_WATCH_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global batch_slots
+    batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    if STARTUP_MODE == "eager":
+        await asyncio.to_thread(load_pipeline)
+        if rag is None:
+            raise RuntimeError(startup["error"])
+    task = asyncio.create_task(run_startup())
+    yield
+    task.cancel()
+
 
 app = FastAPI(
     title="Scripture Wisdom API",
     description="Ask questions about Indian scriptures. Answers grounded strictly in verse text.",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -27,11 +159,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-store = MultiCorpusVectorStore()
-store.load("vector_store_multi.pkl")
-rag = ScriptureRAG(store)
+# Clients opt in to a per-request stage breakdown by sending this header;
+# the timings come back in a Server-Timing response header.
+DEBUG_TIMINGS_HEADER = "X-Debug-Timings"
 
 
 class ChatMessage(BaseModel):
@@ -44,9 +177,19 @@ class QuestionRequest(BaseModel):
     text_filter: str | None = None
     compare_texts: list[str] | None = None
     chat_history: list[ChatMessage] | None = None
+    # Alternative to chat_history: the server keeps a rolling summary per ID.
+    # Send chat_history ([] at first) only to start or restore a conversation.
+    conversation_id: str | None = Field(default=None, max_length=64)
+    # Narrower scopes, ANDed with the text filters and each other; several
+    # values of one field are ORed. Sections match by prefix ("Katha Upanishad").
+    traditions: list[str] | None = None
+    sections: list[str] | None = None
+    chapters: list[str] | None = None
 
 
 class VerseDetail(BaseModel):
+    # Key for /api/similar/{id}.
+    id: str = ""
     text_name: str
     section: str
     chapter: str
@@ -63,6 +206,16 @@ class AnswerResponse(BaseModel):
     verses: list[VerseDetail]
     text_filter: str | None
     compare_mode: bool
+    conversation_id: str | None = None
+    # True when generation missed the deadline: the verses come with a
+    # templated answer (see ANSWER_DEADLINE_SECONDS in rag.py).
+    degraded: bool = False
+
+
+class SimilarResponse(BaseModel):
+    id: str
+    scope: str
+    similar: list[VerseDetail]
 
 
 class TextInfo(BaseModel):
@@ -71,8 +224,7 @@ class TextInfo(BaseModel):
     entry_count: int
 
 
-@app.post("/api/ask", response_model=AnswerResponse)
-async def ask_question(req: QuestionRequest):
+def validate_question(req: QuestionRequest) -> str:
     question = req.question.strip()
     if not question:
         raise HTTPException(status_code=400, detail="Question cannot be empty")
@@ -84,35 +236,303 @@ async def ask_question(req: QuestionRequest):
             status_code=400,
             detail="Cannot use text_filter and compare_texts together. Use one or the other.",
         )
+    return question
 
-    try:
-        history = [m.model_dump() for m in req.chat_history] if req.chat_history else None
-        result = rag.query(
-            question=question,
-            text_filter=req.text_filter,
-            compare_texts=req.compare_texts,
-            chat_history=history,
-        )
-        return AnswerResponse(
-            query=result["query"],
-            answer=result["answer"],
-            verses=[VerseDetail(**v) for v in result["verses"]],
-            text_filter=result.get("text_filter"),
-            compare_mode=result.get("compare_mode", False),
+
+def request_facets(req: QuestionRequest) -> dict[str, list[str]] | None:
+    facets = {"tradition": req.traditions, "section": req.sections, "chapter": req.chapters}
+    return {field: values for field, values in facets.items() if values} or None
+
+
+def answer_response(result: dict, conversation_id: str | None = None) -> AnswerResponse:
+    return AnswerResponse(
+        query=result["query"],
+        answer=result["answer"],
+        verses=[VerseDetail(**v) for v in result["verses"]],
+        text_filter=result.get("text_filter"),
+        compare_mode=result.get("compare_mode", False),
+        conversation_id=conversation_id,
+        degraded=result.get("degraded", False),
+    )
+
+
+def error_response(e: Exception, action: str = "processing question") -> HTTPException:
+    """503 for admission overload, 429 for an exhausted Gemini quota, else 500."""
+    if isinstance(e, Overloaded):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    # google.genai's APIError carries the HTTP status as .code.
+    if getattr(e, "code", None) == 429:
+        return HTTPException(
+            status_code=429,
+            detail="The model's rate limit was reached. Please try again shortly.",
+            headers={"Retry-After": str(QUOTA_RETRY_AFTER)},
         )
+    return HTTPException(status_code=500, detail=f"Error {action}: {str(e)}")
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def until_disconnected(request: Request, work):
+    """Await `work`, cancelling it if the client disconnects first."""
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                DISCONNECTS.inc()
+                raise ClientDisconnected()
+    finally:
+        task.cancel()
+
+
+@app.post("/api/ask", response_model=AnswerResponse)
+async def ask_question(req: QuestionRequest, request: Request, response: Response):
+    question = validate_question(req)
+
+    pipeline = ready_rag()
+    history = [m.model_dump() for m in req.chat_history] if req.chat_history else None
+    history_context = None
+    if req.conversation_id:
+        history_context = conversation_store.context(req.conversation_id)
+        if history_context is None:
+            # A new conversation arrives with chat_history (empty on the first
+            # turn); a follow-up without it is for a conversation this
+            # process has lost, and the client must resend its history.
+            if req.chat_history is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Unknown conversation_id. Resend the question with chat_history.",
+                )
+            history_context = conversation_store.seed(req.conversation_id, history or [])
+    try:
+        with metrics.trace() as timings:
+            with metrics.stage("total"):
+                result = await until_disconnected(request, pipeline.aquery(
+                    question=question,
+                    text_filter=req.text_filter,
+                    compare_texts=req.compare_texts,
+                    chat_history=None if req.conversation_id else history,
+                    history_context=history_context,
+                    facets=request_facets(req),
+                ))
+        # A degraded answer says nothing a follow-up could build on.
+        if req.conversation_id and not result.get("degraded"):
+            conversation_store.record_turn(req.conversation_id, question, result["answer"])
+        if request.headers.get(DEBUG_TIMINGS_HEADER):
+            response.headers["Server-Timing"] = metrics.server_timing(timings)
+        return answer_response(result, req.conversation_id)
+    except ClientDisconnected:
+        # Nobody is listening; 499 is the conventional "client closed request".
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except Exception as e:
+        raise error_response(e)
+
+
+class BatchRequest(BaseModel):
+    items: list[QuestionRequest]
+
+
+def batch_line(
+    index: int,
+    status: int,
+    result: dict | None = None,
+    error: str | None = None,
+    retry_after: str | None = None,
+) -> str:
+    BATCH_ITEMS.inc(outcome="ok" if status == 200 else "error")
+    line = {"index": index, "status": status}
+    if result is not None:
+        line["result"] = result
+    else:
+        line["error"] = error
+    if retry_after is not None:
+        line["retry_after"] = int(retry_after)
+    return json.dumps(line) + "\n"
+
+
+def batch_error_line(index: int, e: Exception, action: str = "processing question") -> str:
+    err = error_response(e, action)
+    return batch_line(index, err.status_code, error=err.detail, retry_after=(err.headers or {}).get("Retry-After"))
+
+
+async def stream_batch(pipeline, items: list[QuestionRequest], request: Request):
+    from rag import CANCELLED, guardrail_response
+
+    pending = []
+    for index, item in enumerate(items):
+        try:
+            question = validate_question(item)
+            if item.conversation_id:
+                raise HTTPException(status_code=400, detail="conversation_id is not supported in batch requests")
+        except HTTPException as e:
+            yield batch_line(index, e.status_code, error=e.detail)
+            continue
+        guarded = guardrail_response(question, item.text_filter, item.compare_texts)
+        if guarded:
+            yield batch_line(index, 200, result=answer_response(guarded).model_dump())
+            continue
+        pending.append((index, question, item))
+    if not pending:
+        return
+    if await request.is_disconnected():
+        DISCONNECTS.inc()
+        CANCELLED.inc(len(pending), stage="skipped")
+        return
+
+    # One embedding pass and one batched ranking for every remaining question,
+    # behind the same admission gates as /api/ask.
+    try:
+        store, retrieved = await pipeline.aretrieve_batch([
+            {
+                "question": q,
+                "text_filter": item.text_filter,
+                "compare_texts": item.compare_texts,
+                "facets": request_facets(item),
+            }
+            for _, q, item in pending
+        ])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+        for index, _, _ in pending:
+            yield batch_error_line(index, e, "retrieving passages")
+        return
+
+    started = 0
+
+    async def generate(index: int, question: str, item: QuestionRequest, passages: list[dict]) -> str | None:
+        """The item's NDJSON line, or None when the client has gone and it was not started."""
+        nonlocal started
+        try:
+            async with batch_slots:
+                if await request.is_disconnected():
+                    return None
+                started += 1
+                result = await pipeline.aanswer(
+                    question, passages, store,
+                    text_filter=item.text_filter,
+                    compare_texts=item.compare_texts,
+                    chat_history=[m.model_dump() for m in item.chat_history] if item.chat_history else None,
+                    facets=request_facets(item),
+                )
+        except Exception as e:
+            return batch_error_line(index, e)
+        return batch_line(index, 200, result=answer_response(result).model_dump())
+
+    tasks = [
+        asyncio.ensure_future(generate(index, question, item, passages))
+        for (index, question, item), passages in zip(pending, retrieved)
+    ]
+    streamed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            if line is None:
+                return
+            yield line
+            streamed += 1
+    finally:
+        # Ending early means the client went away: cancel generations in
+        # flight (counted by aanswer) and never start the rest.
+        for task in tasks:
+            task.cancel()
+        if streamed < len(tasks):
+            DISCONNECTS.inc()
+        if started < len(tasks):
+            CANCELLED.inc(len(tasks) - started, stage="skipped")
+
+
+@app.post("/api/ask/batch")
+async def ask_batch(req: BatchRequest, request: Request):
+    """
+    Answer many questions in one request. Questions are embedded and searched
+    together and answers generated with bounded concurrency (BATCH_CONCURRENCY),
+    through the same admission gates and priority lanes as /api/ask.
+    Results stream back as NDJSON, one line per item in completion order:
+    {"index": i, "status": 200, "result": {...}} or {"index": i, "status": 4xx|5xx, "error": "..."},
+    with "retry_after" (seconds) on 429 and 503.
+    A failed item does not fail the batch. If the client disconnects, items
+    in flight are cancelled and the rest are not started.
+    """
+    if not req.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {BATCH_MAX_ITEMS} items)")
+    pipeline = ready_rag()
+    return StreamingResponse(stream_batch(pipeline, req.items, request), media_type="application/x-ndjson")
 
 
 @app.get("/api/texts", response_model=list[TextInfo])
 async def list_texts():
-    return [TextInfo(**t) for t in store.get_available_texts()]
+    return [TextInfo(**t) for t in ready_rag().store.get_available_texts()]
+
+
+@app.get("/api/similar/{doc_id:path}", response_model=SimilarResponse)
+async def similar_verses(doc_id: str, k: int = Query(8, ge=1, le=20), scope: str = "all"):
+    """Verses most like a cited verse, from the precomputed related-verses graph."""
+    from rag import verse_data
+
+    if scope not in ("all", "within", "cross"):
+        raise HTTPException(status_code=400, detail="scope must be one of: all, within, cross")
+    results = ready_rag().store.similar(doc_id, k, scope)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Unknown verse id: {doc_id}")
+    return SimilarResponse(id=doc_id, scope=scope, similar=[VerseDetail(**verse_data(r)) for r in results])
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/health")
 async def health():
+    """Liveness: answers as soon as the server is up, with readiness in "ready"."""
+    if rag is None:
+        return {"status": startup["state"], "ready": False, "error": startup["error"],
+                "startup_seconds": startup["seconds"]}
+    store = rag.store
     return {
         "status": "ok",
+        "ready": True,
+        "startup_seconds": startup["seconds"],
         "total_entries": len(store.documents),
-        "texts": {name: len(idx) for name, idx in store.text_indices.items()},
+        "texts": store.documents.counts("text_name"),
+        "embedding": store.provider.manifest(),
+        "store_version": store.version,
+        "admission": rag.admission.status(),
     }
+
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness: 503 until the store has loaded."""
+    ready_rag()
+    return {"status": "ready", "store_version": rag.store.version}
+
+
+def require_admin(token: str | None):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/api/admin/store")
+async def store_status(x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    ready_rag()
+    return reloader.status()
+
+
+@app.post("/api/admin/reload", status_code=202)
+async def reload_store(background_tasks: BackgroundTasks, x_admin_token: str | None = Header(default=None)):
+    """Reload the store file in the background; poll /api/admin/store for the result."""
+    require_admin(x_admin_token)
+    ready_rag()
+    if reloader.loading:
+        raise HTTPException(status_code=409, detail="A reload is already running")
+    background_tasks.add_task(reloader.reload_quietly)
+    return {"status": "reloading", "current_version": rag.store.version}
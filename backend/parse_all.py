@@ -1,14 +1,18 @@
 """
-Master script to parse all available scripture PDFs into a unified JSON corpus.
+Master script to parse all available scripture PDFs into per-text corpus files.
 Each text is parsed independently and tagged with its tradition.
+
+Usage: python parse_all.py [--compress] [--json]
+  --compress  zlib-compress corpus blocks (smaller files, slower loads)
+  --json      also export each corpus as indented JSON for inspection
 """
 
-import json
 import os
 import sys
 
 sys.path.insert(0, os.path.dirname(__file__))
 
+from corpus_format import export_json, write_corpus
 from parsers.gita import parse as parse_gita
 from parsers.upanishads import parse as parse_upanishads
 from parsers.manusmriti import parse as parse_manusmriti
@@ -23,42 +27,44 @@ TEXT_CONFIGS = [
         "name": "Bhagavad Gita",
         "pdf": "Bhagavad-gita-As-It-Is.pdf",
         "parser": parse_gita,
-        "output": "corpus_gita.json",
+        "output": "corpus_gita.corpus",
     },
     {
         "name": "Upanishads",
         "pdf": "upanishads_nikhilananda.pdf",
         "parser": parse_upanishads,
-        "output": "corpus_upanishads.json",
+        "output": "corpus_upanishads.corpus",
     },
     {
         "name": "Manusmriti",
         "pdf": "Manu-Smriti.pdf",
         "parser": parse_manusmriti,
-        "output": "corpus_manusmriti.json",
+        "output": "corpus_manusmriti.corpus",
     },
     {
         "name": "Arthashastra",
         "pdf": "R. Shamasastry-Kautilya's Arthashastra   (1915).pdf",
         "parser": parse_arthashastra,
-        "output": "corpus_arthashastra.json",
+        "output": "corpus_arthashastra.corpus",
     },
     {
         "name": "Mahabharata",
         "pdf": "The Complete Mahabharata .pdf",
         "parser": parse_mahabharata,
-        "output": "corpus_mahabharata.json",
+        "output": "corpus_mahabharata.corpus",
     },
     {
         "name": "Ramayana",
         "pdf": "Valmiki-Ramayana-Eng-Translation-Griffith.pdf",
         "parser": parse_ramayana,
-        "output": "corpus_ramayana.json",
+        "output": "corpus_ramayana.corpus",
     },
 ]
 
 
 def main():
+    compress = "--compress" in sys.argv
+    with_json = "--json" in sys.argv
     all_entries = []
     summary = {}
 
@@ -73,9 +79,10 @@ def main():
         print(f"  -> {len(entries)} entries")
 
         out_path = os.path.join(os.path.dirname(__file__), cfg["output"])
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(entries, f, ensure_ascii=False, indent=2)
-        print(f"  -> Saved to {cfg['output']}")
+        write_corpus(out_path, entries, compress=compress)
+        print(f"  -> Saved to {cfg['output']} ({os.path.getsize(out_path) / 1024:.0f} KB)")
+        if with_json:
+            print(f"  -> Exported {os.path.basename(export_json(out_path))}")
 
         if entries:
             e = entries[0]
@@ -0,0 +1,213 @@
+"""
+Table-driven line parser shared by all scripture parsers.
+
+Each text is described by a TextRules table: an ordered list of line rules
+(skip, heading, verse start, ...), how buffered text is labelled, and the
+chunking and deduplication policy. run() walks the stripped PDF lines once;
+the first rule whose pattern and guard both match a line decides what happens
+to it, and unmatched lines are buffered into the current record.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .base import ScriptureEntry
+
+WHITESPACE_PAT = re.compile(r"\s+")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass(frozen=True)
+class ChunkPolicy:
+    """Split long records into sentence-aligned chunks of at most max_chars."""
+    max_chars: int = 1500
+    boundary: re.Pattern = SENTENCE_BOUNDARY
+
+
+@dataclass
+class ParseState:
+    lines: list[str]
+    fields: dict[str, Any]
+    open: bool = False
+    index: int = 0
+    record_start: int = 0
+    buffer: list[str] = field(default_factory=list)
+    tables: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def line(self) -> str:
+        return self.lines[self.index]
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One line rule. A rule with no actions simply skips the line.
+
+    Actions run in this order: keep the line in the buffer, flush the buffer
+    as an entry, assign fields, open or close the record, clear the buffer,
+    and seed the buffer with a match group.
+    assign values: an int is a match group, a callable receives the match,
+    anything else is stored as is.
+    """
+    pattern: re.Pattern | None = None
+    when: Callable[[ParseState, re.Match | None], bool] | None = None
+    keep: bool = False
+    flush: bool = False
+    assign: dict[str, Any] = field(default_factory=dict)
+    open: bool | None = None
+    clear: bool = False
+    seed: int | None = None
+
+
+@dataclass(frozen=True)
+class TextRules:
+    text_name: str
+    translation_source: str
+    tradition: str
+    rules: tuple[Rule, ...]
+    # (section, chapter, verse) for the current fields, or None to drop the record.
+    # The verse is replaced by the chunk number when chunking is set.
+    label: Callable[[dict], tuple[str, str, str] | None]
+    fields: dict[str, Any] = field(default_factory=dict)
+    start_open: bool = False
+    accept: Callable[[ParseState], bool] | None = None
+    clean: Callable[[str], str] | None = None
+    min_chars: int = 1
+    chunking: ChunkPolicy | None = None
+    dedup_key: Callable[[dict], Any] | None = None
+    sort_key: Callable[[dict], Any] | None = None
+    prepare: Callable[[list[str]], dict[str, Any]] | None = None
+
+
+def run(rules: TextRules, full_text: str) -> list[dict]:
+    lines = [line.strip() for line in full_text.split("\n")]
+    state = ParseState(lines=lines, fields=dict(rules.fields), open=rules.start_open)
+    if rules.prepare:
+        state.tables = rules.prepare(lines)
+
+    table = [(r.pattern.match if r.pattern is not None else None, r) for r in rules.rules]
+    accept = rules.accept
+    entries: list[dict] = []
+
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        state.index = i
+        for match_fn, rule in table:
+            m = None
+            if match_fn is not None:
+                m = match_fn(line)
+                if m is None:
+                    continue
+            if rule.when is not None and not rule.when(state, m):
+                continue
+            _apply(rule, m, state, rules, entries)
+            break
+        else:
+            if state.open and (accept is None or accept(state)):
+                state.buffer.append(line)
+
+    _flush(state, rules, entries)
+
+    if rules.dedup_key:
+        entries = deduplicate(entries, rules.dedup_key, rules.sort_key)
+    return entries
+
+
+def _apply(rule: Rule, m: re.Match | None, state: ParseState, rules: TextRules, entries: list[dict]):
+    if rule.keep:
+        state.buffer.append(state.line)
+    if rule.flush:
+        _flush(state, rules, entries)
+    for name, value in rule.assign.items():
+        if isinstance(value, int) and not isinstance(value, bool):
+            value = m.group(value)
+        elif callable(value):
+            value = value(m)
+        state.fields[name] = value
+    if rule.open is not None:
+        state.open = rule.open
+        state.record_start = state.index
+    if rule.clear:
+        state.buffer = []
+    if rule.seed is not None:
+        text = m.group(rule.seed).strip()
+        if text:
+            state.buffer.append(text)
+
+
+def _flush(state: ParseState, rules: TextRules, entries: list[dict]):
+    if not state.buffer:
+        return
+    text = normalize_whitespace(" ".join(state.buffer))
+    state.buffer = []
+    if rules.clean:
+        text = rules.clean(text)
+    if len(text) < rules.min_chars:
+        return
+    label = rules.label(state.fields)
+    if label is None:
+        return
+
+    section, chapter, verse = label
+    chunks = split_into_chunks(text, rules.chunking) if rules.chunking else [text]
+    for idx, chunk in enumerate(chunks):
+        if rules.chunking:
+            verse = "1" if len(chunks) == 1 else str(idx + 1)
+        entry = ScriptureEntry(
+            text_name=rules.text_name,
+            section=section,
+            chapter=chapter,
+            verse=verse,
+            translation=chunk,
+            translation_source=rules.translation_source,
+            tradition=rules.tradition,
+        )
+        entries.append(entry.to_dict())
+
+
+def normalize_whitespace(text: str) -> str:
+    return WHITESPACE_PAT.sub(" ", text).strip()
+
+
+def split_into_chunks(text: str, policy: ChunkPolicy) -> list[str]:
+    """Split long record text into sentence-aligned chunks."""
+    if len(text) <= policy.max_chars:
+        return [text]
+
+    sentences = policy.boundary.split(text)
+    chunks = []
+    current = []
+    current_len = 0
+
+    for sent in sentences:
+        if current_len + len(sent) > policy.max_chars and current:
+            chunks.append(" ".join(current))
+            current = [sent]
+            current_len = len(sent)
+        else:
+            current.append(sent)
+            current_len += len(sent) + 1
+
+    if current:
+        chunks.append(" ".join(current))
+
+    return chunks
+
+
+def deduplicate(
+    entries: list[dict],
+    key: Callable[[dict], Any],
+    sort_key: Callable[[dict], Any] | None = None,
+) -> list[dict]:
+    """Keep the entry with the longest translation for each key."""
+    seen = {}
+    for e in entries:
+        k = key(e)
+        if k not in seen or len(e["translation"]) > len(seen[k]["translation"]):
+            seen[k] = e
+    if sort_key is None:
+        return list(seen.values())
+    return sorted(seen.values(), key=sort_key)
@@ -1,7 +1,8 @@
 """Parser for Bhagavad Gita As It Is (Prabhupada) PDF."""
 
 import re
-from .base import ScriptureEntry, extract_pdf_text
+from .base import extract_pdf_text
+from .engine import Rule, TextRules, run
 
 
 CHAPTER_MAP = {
@@ -11,99 +12,66 @@ CHAPTER_MAP = {
     "SIXTEEN": 16, "SEVENTEEN": 17, "EIGHTEEN": 18,
 }
 
+# Lines after a TEXT heading that may still belong to its translation.
+VERSE_WINDOW = 150
+
+
+def _in_window(st) -> bool:
+    return st.index - st.record_start <= VERSE_WINDOW
+
+
+# A TEXT heading opens a verse; only the lines between TRANSLATION and PURPORT
+# are kept, and purports are skipped entirely.
+RULES = TextRules(
+    text_name="Bhagavad Gita",
+    translation_source="A.C. Bhaktivedanta Swami Prabhupada",
+    tradition="Vedic",
+    fields={"chapter": 0, "verse": "", "capturing": False, "in_purport": False},
+    rules=(
+        Rule(
+            re.compile(
+                r"^CHAPTER\s+(ONE|TWO|THREE|FOUR|FIVE|SIX|SEVEN|EIGHT|NINE|TEN|"
+                r"ELEVEN|TWELVE|THIRTEEN|FOURTEEN|FIFTEEN|SIXTEEN|SEVENTEEN|EIGHTEEN)\b"
+            ),
+            flush=True,
+            assign={"chapter": lambda m: CHAPTER_MAP[m.group(1)]},
+            open=False,
+        ),
+        Rule(
+            re.compile(r"^TEXTS?\s+(\d+(?:[–\-−]+\d+)?)\s*$"),
+            when=lambda st, m: st.fields["chapter"] > 0,
+            flush=True,
+            assign={
+                "verse": lambda m: m.group(1).replace("–", "-").replace("−", "-"),
+                "capturing": False,
+                "in_purport": False,
+            },
+            open=True,
+        ),
+        Rule(
+            re.compile(r"^TRANSLATION\s*$"),
+            when=lambda st, m: (
+                st.open and _in_window(st)
+                and not st.fields["capturing"] and not st.fields["in_purport"]
+            ),
+            clear=True,
+            assign={"capturing": True},
+        ),
+        Rule(
+            re.compile(r"^PURPORT\s*$"),
+            when=lambda st, m: st.open and _in_window(st) and not st.fields["in_purport"],
+            assign={"capturing": False, "in_purport": True},
+        ),
+    ),
+    accept=lambda st: st.fields["capturing"] and _in_window(st),
+    label=lambda f: ("", str(f["chapter"]), f["verse"]),
+    dedup_key=lambda e: (e["chapter"], e["verse"]),
+    sort_key=lambda x: (int(x["chapter"]), _vs(x["verse"])),
+)
 
-def parse(pdf_path: str) -> list[dict]:
-    full_text = extract_pdf_text(pdf_path)
-    lines = full_text.split("\n")
-    entries = []
-    current_chapter = 0
-
-    chapter_pat = re.compile(
-        r"^CHAPTER\s+(ONE|TWO|THREE|FOUR|FIVE|SIX|SEVEN|EIGHT|NINE|TEN|"
-        r"ELEVEN|TWELVE|THIRTEEN|FOURTEEN|FIFTEEN|SIXTEEN|SEVENTEEN|EIGHTEEN)\b",
-        re.MULTILINE,
-    )
-    text_pat = re.compile(r"^TEXTS?\s+(\d+(?:[–\-−]+\d+)?)\s*$", re.MULTILINE)
-    trans_pat = re.compile(r"^TRANSLATION\s*$", re.MULTILINE)
-    purp_pat = re.compile(r"^PURPORT\s*$", re.MULTILINE)
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        chap_match = chapter_pat.match(line)
-        if chap_match:
-            current_chapter = CHAPTER_MAP[chap_match.group(1)]
-            i += 1
-            continue
-
-        text_match = text_pat.match(line)
-        if text_match and current_chapter > 0:
-            verse_ref = text_match.group(1).replace("–", "-").replace("−", "-")
-            i += 1
-            translation_text = ""
-            purport_text = ""
-
-            search_limit = min(i + 150, len(lines))
-            j = i
-            while j < search_limit:
-                s = lines[j].strip()
-                if text_pat.match(s) or chapter_pat.match(s):
-                    break
-
-                if trans_pat.match(s):
-                    j += 1
-                    buf = []
-                    while j < search_limit:
-                        s2 = lines[j].strip()
-                        if purp_pat.match(s2) or text_pat.match(s2) or chapter_pat.match(s2):
-                            break
-                        buf.append(s2)
-                        j += 1
-                    translation_text = re.sub(r"\s+", " ", " ".join(buf)).strip()
-                    continue
 
-                if purp_pat.match(s):
-                    j += 1
-                    buf = []
-                    while j < search_limit:
-                        s2 = lines[j].strip()
-                        if text_pat.match(s2) or chapter_pat.match(s2):
-                            break
-                        buf.append(s2)
-                        j += 1
-                    purport_text = re.sub(r"\s+", " ", " ".join(buf)).strip()[:2000]
-                    continue
-
-                j += 1
-
-            if translation_text:
-                entry = ScriptureEntry(
-                    text_name="Bhagavad Gita",
-                    section="",
-                    chapter=str(current_chapter),
-                    verse=verse_ref,
-                    translation=translation_text,
-                    translation_source="A.C. Bhaktivedanta Swami Prabhupada",
-                    tradition="Vedic",
-                )
-                entries.append(entry.to_dict())
-            i = j
-            continue
-
-        i += 1
-
-    entries = _deduplicate(entries)
-    return entries
-
-
-def _deduplicate(entries: list[dict]) -> list[dict]:
-    seen = {}
-    for e in entries:
-        key = f"{e['chapter']}:{e['verse']}"
-        if key not in seen or len(e["translation"]) > len(seen[key]["translation"]):
-            seen[key] = e
-    return sorted(seen.values(), key=lambda x: (int(x["chapter"]), _vs(x["verse"])))
+def parse(pdf_path: str) -> list[dict]:
+    return run(RULES, extract_pdf_text(pdf_path))
 
 
 def _vs(v: str) -> int:
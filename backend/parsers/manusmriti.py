@@ -1,111 +1,76 @@
 """Parser for Manusmriti PDF — chapter.verse format with English translations."""
 
 import re
-from .base import ScriptureEntry, extract_pdf_text
+
+import numpy as np
+
+from .base import extract_pdf_text
+from .engine import Rule, TextRules, run
+
+# Characters that count towards the garbage ratio besides anything non-ASCII.
+GARBAGE_ASCII = "\\#$@{}[]"
+GARBAGE_RATIO = 0.15
+
+# Deletes every ASCII character that is *not* a garbage marker, so the length
+# of a translated line is its garbage-character count.
+_KEEP_GARBAGE = str.maketrans(
+    "", "", "".join(chr(c) for c in range(128) if chr(c) not in GARBAGE_ASCII + "\n")
+)
+_SHOUTING_LINE = re.compile(r"^(?:[A-Z\d]|[^\w\n]){10,}$", re.MULTILINE)
+
+
+def _prepare(lines: list[str]) -> dict:
+    return {"garbage": _sanskrit_garbage_mask(lines)}
+
+
+# Verses open on "ch.vs." lines (with or without text on the same line); a
+# chapter heading closes the current verse until the next one starts.
+RULES = TextRules(
+    text_name="Manusmriti",
+    translation_source="G. Bühler (Sacred Books of the East)",
+    tradition="Dharmashastra",
+    fields={"chapter": "1", "verse": ""},
+    rules=(
+        Rule(re.compile(r"^(\d+)\.(\d+)\.\s*(.+)"), flush=True, assign={"chapter": 1, "verse": 2}, open=True, seed=3),
+        Rule(re.compile(r"^(\d+)\.(\d+)\.\s*$"), flush=True, assign={"chapter": 1, "verse": 2}, open=True),
+        Rule(re.compile(r"^Chapter\s+(\d+)\s*$", re.IGNORECASE), flush=True, open=False),
+        Rule(when=lambda st, m: st.tables["garbage"][st.index]),
+    ),
+    prepare=_prepare,
+    label=lambda f: (f"Chapter {f['chapter']}", f["chapter"], f["verse"]),
+    min_chars=6,
+    dedup_key=lambda e: (e["chapter"], e["verse"]),
+    sort_key=lambda x: (int(x["chapter"]), int(x["verse"])),
+)
 
 
 def parse(pdf_path: str) -> list[dict]:
-    full_text = extract_pdf_text(pdf_path)
-    lines = full_text.split("\n")
-    entries = []
-
-    current_chapter = "1"
-    chapter_heading_pat = re.compile(r"^Chapter\s+(\d+)\s*$", re.IGNORECASE)
-    verse_pat = re.compile(r"^(\d+)\.(\d+)\.\s*(.+)")
-    verse_start_pat = re.compile(r"^(\d+)\.(\d+)\.\s*$")
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        ch_match = chapter_heading_pat.match(line)
-        if ch_match:
-            current_chapter = ch_match.group(1)
-            i += 1
-            continue
-
-        inline_match = verse_pat.match(line)
-        if inline_match:
-            ch = inline_match.group(1)
-            vs = inline_match.group(2)
-            text_start = inline_match.group(3).strip()
-            i += 1
-
-            verse_lines = [text_start] if text_start else []
-            while i < len(lines):
-                s = lines[i].strip()
-                if not s:
-                    i += 1
-                    continue
-                if verse_pat.match(s) or verse_start_pat.match(s) or chapter_heading_pat.match(s):
-                    break
-                if _is_sanskrit_garbage(s):
-                    i += 1
-                    continue
-                verse_lines.append(s)
-                i += 1
-
-            translation = re.sub(r"\s+", " ", " ".join(verse_lines)).strip()
-            if translation and len(translation) > 5:
-                entry = ScriptureEntry(
-                    text_name="Manusmriti",
-                    section=f"Chapter {ch}",
-                    chapter=ch,
-                    verse=vs,
-                    translation=translation,
-                    translation_source="G. Bühler (Sacred Books of the East)",
-                    tradition="Dharmashastra",
-                )
-                entries.append(entry.to_dict())
-            continue
-
-        bare_match = verse_start_pat.match(line)
-        if bare_match:
-            ch = bare_match.group(1)
-            vs = bare_match.group(2)
-            i += 1
-            verse_lines = []
-            while i < len(lines):
-                s = lines[i].strip()
-                if not s:
-                    i += 1
-                    continue
-                if verse_pat.match(s) or verse_start_pat.match(s) or chapter_heading_pat.match(s):
-                    break
-                if _is_sanskrit_garbage(s):
-                    i += 1
-                    continue
-                verse_lines.append(s)
-                i += 1
-
-            translation = re.sub(r"\s+", " ", " ".join(verse_lines)).strip()
-            if translation and len(translation) > 5:
-                entry = ScriptureEntry(
-                    text_name="Manusmriti",
-                    section=f"Chapter {ch}",
-                    chapter=ch,
-                    verse=vs,
-                    translation=translation,
-                    translation_source="G. Bühler (Sacred Books of the East)",
-                    tradition="Dharmashastra",
-                )
-                entries.append(entry.to_dict())
-            continue
-
-        i += 1
-
-    entries = _deduplicate(entries)
-    return entries
-
-
-def _is_sanskrit_garbage(line: str) -> bool:
-    """Detect garbled Sanskrit transliteration lines from the PDF."""
-    non_ascii = sum(1 for c in line if ord(c) > 127 or c in "\\#$@{}[]¾Â")
-    if len(line) > 0 and non_ascii / max(len(line), 1) > 0.15:
-        return True
-    if re.match(r'^[A-Z\W\d]{10,}$', line) and not any(c.islower() for c in line[:20]):
-        return True
-    return False
+    return run(RULES, extract_pdf_text(pdf_path))
+
+
+def _sanskrit_garbage_mask(lines: list[str]) -> np.ndarray:
+    """Detect garbled Sanskrit transliteration lines from the PDF.
+
+    Classifies all (already stripped) lines in one pass over the joined buffer:
+    a line is garbage if more than GARBAGE_RATIO of its characters are
+    non-ASCII or garbage markers, or if it is 10+ characters of capitals,
+    digits and punctuation with no lowercase letter in its first 20 chars.
+    """
+    if not lines:
+        return np.zeros(0, dtype=bool)
+    buffer = "\n".join(lines)
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    marks = np.fromiter(
+        map(len, buffer.translate(_KEEP_GARBAGE).split("\n")), dtype=np.int64, count=len(lines)
+    )
+    mask = (lengths > 0) & (marks / np.maximum(lengths, 1) > GARBAGE_RATIO)
+
+    starts = np.cumsum(lengths + 1) - (lengths + 1)
+    for m in _SHOUTING_LINE.finditer(buffer):
+        i = int(np.searchsorted(starts, m.start(), side="right")) - 1
+        if not any(c.islower() for c in lines[i][:20]):
+            mask[i] = True
+    return mask
 
 
 def _clean_translation(text: str) -> str:
@@ -114,12 +79,3 @@ def _clean_translation(text: str) -> str:
     if parts:
         return parts[0].strip()
     return text
-
-
-def _deduplicate(entries: list[dict]) -> list[dict]:
-    seen = {}
-    for e in entries:
-        key = f"{e['chapter']}:{e['verse']}"
-        if key not in seen or len(e["translation"]) > len(seen[key]["translation"]):
-            seen[key] = e
-    return sorted(seen.values(), key=lambda x: (int(x["chapter"]), int(x["verse"])))
@@ -1,7 +1,8 @@
 """Parser for The Upanishads (Swami Nikhilananda translation) PDF."""
 
 import re
-from .base import ScriptureEntry, extract_pdf_text
+from .base import extract_pdf_text
+from .engine import Rule, TextRules, run
 
 UPANISHAD_NAMES = [
     "Katha Upanishad",
@@ -18,100 +19,82 @@ UPANISHAD_NAMES = [
 ]
 
 
+UPANISHAD_PAT = re.compile(
+    r"^(" + "|".join(re.escape(n) for n in UPANISHAD_NAMES) + r")\s*$"
+)
+VERSE_PAT = re.compile(r"^(\d+(?:\s*[—–-]\s*\d+)?)\s*$")
+HEADER_MARKER = 'Source: "The Upanishads'
+PAGE_HEADER_WINDOW = 3
+
+
+def _verse_number(m: re.Match) -> str:
+    return m.group(1).replace("—", "-").replace("–", "-").strip()
+
+
+def _prepare(lines: list[str]) -> dict:
+    """Mark every line within PAGE_HEADER_WINDOW of a page header, once up front."""
+    n = len(lines)
+    near_header = [False] * n
+    for i, line in enumerate(lines):
+        if HEADER_MARKER in line:
+            for j in range(max(0, i - PAGE_HEADER_WINDOW), min(n, i + PAGE_HEADER_WINDOW + 1)):
+                near_header[j] = True
+    return {"near_header": near_header}
+
+
+def _label(f: dict) -> tuple[str, str, str]:
+    section = f["upanishad"]
+    if f["part"]:
+        section += f", Part {f['part']}"
+    if f["chapter"]:
+        section += f", Chapter {f['chapter']}"
+    return (section, f["chapter"] or f["part"] or "1", f["verse"])
+
+
+# A bare number opens a verse unless it is a page number or continues a list
+# (the previous verse line ends with a comma); headings close the verse.
+RULES = TextRules(
+    text_name="Upanishads",
+    translation_source="Swami Nikhilananda",
+    tradition="Vedic",
+    fields={"upanishad": "", "part": "", "chapter": "", "verse": ""},
+    rules=(
+        Rule(re.compile(r'^Source:\s*"The Upanishads')),
+        Rule(when=lambda st, m: not st.open and _is_stray_digits(st.line)),
+        Rule(UPANISHAD_PAT, flush=True, assign={"upanishad": 1, "part": "", "chapter": ""}, open=False),
+        Rule(
+            re.compile(r"^Part\s+(One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten)\s*$", re.IGNORECASE),
+            flush=True,
+            assign={"part": 1},
+            open=False,
+        ),
+        Rule(
+            re.compile(r"^Chapter\s+([IVXLC]+(?:\s*[–—-]\s*.+)?)\s*$", re.IGNORECASE),
+            flush=True,
+            assign={"chapter": lambda m: m.group(1).strip()},
+            open=False,
+        ),
+        Rule(VERSE_PAT, when=lambda st, m: st.open and _is_continuation(st.buffer), keep=True),
+        Rule(VERSE_PAT, when=lambda st, m: not st.fields["upanishad"]),
+        Rule(
+            VERSE_PAT,
+            when=lambda st, m: _is_page_number(_verse_number(m), st.tables["near_header"], st.index),
+            flush=True,
+            open=False,
+        ),
+        Rule(VERSE_PAT, flush=True, assign={"verse": _verse_number}, open=True),
+    ),
+    prepare=_prepare,
+    label=_label,
+    min_chars=11,
+)
+
+
 def parse(pdf_path: str) -> list[dict]:
-    full_text = extract_pdf_text(pdf_path)
-    lines = full_text.split("\n")
-    entries = []
-
-    current_upanishad = ""
-    current_part = ""
-    current_chapter = ""
-    current_verse_num = ""
-
-    upanishad_pat = re.compile(
-        r"^(" + "|".join(re.escape(n) for n in UPANISHAD_NAMES) + r")\s*$"
-    )
-    part_pat = re.compile(r"^Part\s+(One|Two|Three|Four|Five|Six|Seven|Eight|Nine|Ten)\s*$", re.IGNORECASE)
-    chapter_pat = re.compile(r"^Chapter\s+([IVXLC]+(?:\s*[–—-]\s*.+)?)\s*$", re.IGNORECASE)
-    verse_pat = re.compile(r"^(\d+(?:\s*[—–-]\s*\d+)?)\s*$")
-    header_pat = re.compile(r'^Source:\s*"The Upanishads')
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        if not line or header_pat.match(line) or line.isdigit() and len(line) <= 4 and not verse_pat.match(line):
-            i += 1
-            continue
-
-        up_match = upanishad_pat.match(line)
-        if up_match:
-            current_upanishad = up_match.group(1)
-            current_part = ""
-            current_chapter = ""
-            i += 1
-            continue
-
-        part_match = part_pat.match(line)
-        if part_match:
-            current_part = part_match.group(1)
-            i += 1
-            continue
-
-        ch_match = chapter_pat.match(line)
-        if ch_match:
-            current_chapter = ch_match.group(1).strip()
-            i += 1
-            continue
-
-        verse_match = verse_pat.match(line)
-        if verse_match and current_upanishad:
-            raw_num = verse_match.group(1).replace("—", "-").replace("–", "-").strip()
-            if _is_page_number(raw_num, lines, i):
-                i += 1
-                continue
-
-            current_verse_num = raw_num
-            i += 1
-            verse_lines = []
-            while i < len(lines):
-                s = lines[i].strip()
-                if not s or header_pat.match(s):
-                    i += 1
-                    continue
-                if verse_pat.match(s) and not _is_continuation(s, verse_lines):
-                    break
-                if upanishad_pat.match(s) or part_pat.match(s) or chapter_pat.match(s):
-                    break
-                verse_lines.append(s)
-                i += 1
-
-            text = re.sub(r"\s+", " ", " ".join(verse_lines)).strip()
-            if text and len(text) > 10:
-                section = current_upanishad
-                if current_part:
-                    section += f", Part {current_part}"
-                if current_chapter:
-                    section += f", Chapter {current_chapter}"
-
-                entry = ScriptureEntry(
-                    text_name="Upanishads",
-                    section=section,
-                    chapter=current_chapter or current_part or "1",
-                    verse=current_verse_num,
-                    translation=text,
-                    translation_source="Swami Nikhilananda",
-                    tradition="Vedic",
-                )
-                entries.append(entry.to_dict())
-            continue
-
-        i += 1
-
-    return entries
-
-
-def _is_page_number(num_str: str, lines: list[str], idx: int) -> bool:
+    return run(RULES, extract_pdf_text(pdf_path))
+
+
+def _is_page_number(num_str: str, near_header: list[bool], idx: int) -> bool:
     """Heuristic: if the number is on a line near a Source: header, it's a page number."""
     try:
         n = int(num_str)
@@ -119,13 +102,14 @@ def _is_page_number(num_str: str, lines: list[str], idx: int) -> bool:
         return False
     if n > 500:
         return True
-    for offset in range(-3, 4):
-        j = idx + offset
-        if 0 <= j < len(lines) and 'Source: "The Upanishads' in lines[j]:
-            return True
-    return False
+    return near_header[idx]
+
+
+def _is_stray_digits(line: str) -> bool:
+    """Short digit runs that are not verse numbers (e.g. superscript footnote marks)."""
+    return line.isdigit() and len(line) <= 4 and not VERSE_PAT.match(line)
 
 
-def _is_continuation(line: str, prev_lines: list[str]) -> bool:
+def _is_continuation(prev_lines: list[str]) -> bool:
     """Check if a number on its own line is actually part of a list in the verse text."""
     return len(prev_lines) > 0 and prev_lines[-1].endswith(",")
@@ -2,14 +2,68 @@
 RAG pipeline for multi-text Indian scripture QA.
 Retrieves from a single text by default; supports cross-text comparison when requested.
 Enforces strict citation and refusal when verses are absent.
-Supports multi-turn chat via chat_history parameter.
+Supports multi-turn chat via chat_history, or a prebuilt history_context
+(see conversations.py). aquery() serves the API: cached answers first, and a
+verses-only response when generation misses its deadline, if one is set.
 """
 
+import asyncio
+import functools
 import os
-
-from google import genai
+import time
+
+import metrics
+from admission import Admission, Overloaded, request_lane
+from answer_cache import AnswerCache, cache_key
+from genai_client import GENERATE_TIMEOUT, call_options, get_client, types
+from hedging import HEDGE_ENABLED, HedgePolicy
+from metrics import stage
+from token_budget import (
+    MIN_PASSAGE_TOKENS,
+    PASSAGE_OVERHEAD_TOKENS,
+    PROMPT_TOKEN_BUDGET,
+    estimate_tokens,
+    fit_passages,
+    output_token_limit,
+)
 from vector_store import MultiCorpusVectorStore
 
+# Optional retrieval diversity: MMR trade-off (1.0 ranks by relevance alone;
+# unset, the default, disables it) and a cap on passages from one chapter or
+# canto (0 disables it).
+_mmr_lambda = os.getenv("MMR_LAMBDA", "")
+MMR_LAMBDA = float(_mmr_lambda) if _mmr_lambda else None
+MAX_PASSAGES_PER_CHAPTER = int(os.getenv("MAX_PASSAGES_PER_CHAPTER", "0")) or None
+# Seconds aquery() waits for an answer before returning the verses alone
+# (0, the default, waits for the model), and whether a late generation then
+# finishes in the background to fill the answer cache. A background
+# generation keeps its generate slot, since it still loads Gemini; at most
+# MAX_BACKGROUND_GENERATIONS run at once and later ones are cancelled.
+ANSWER_DEADLINE_SECONDS = float(os.getenv("ANSWER_DEADLINE_SECONDS", "0"))
+BACKGROUND_COMPLETION = os.getenv("BACKGROUND_COMPLETION", "1") == "1"
+MAX_BACKGROUND_GENERATIONS = int(os.getenv("MAX_BACKGROUND_GENERATIONS", "2"))
+
+QUERIES = metrics.counter(
+    "sutra_rag_queries_total",
+    "RAG queries by outcome (answered, cached, degraded, rejected, refused, guardrail, error).",
+    labels=("outcome",),
+)
+LLM_TOKENS = metrics.counter(
+    "sutra_llm_tokens_total",
+    "Gemini generation tokens by direction (in, out).",
+    labels=("direction",),
+)
+CANCELLED = metrics.counter(
+    "sutra_cancelled_work_total",
+    "Work cancelled because the client went away, by stage (retrieve, generate; skipped: batch items never started).",
+    labels=("stage",),
+)
+BACKGROUND = metrics.counter(
+    "sutra_background_generations_total",
+    "Generations that missed their deadline, by outcome (completed, failed, cancelled).",
+    labels=("outcome",),
+)
+
 
 SINGLE_TEXT_PROMPT = """You are a knowledgeable and enthusiastic guide to Indian scriptures — a scholar who genuinely loves this material and wants to share it with depth and clarity.
 
@@ -126,6 +180,11 @@ GUARDRAIL_KEYWORDS = [
     "apply to", "real life", "practical advice", "life advice",
 ]
 
+DEGRADED_ANSWER = (
+    "The full answer is taking longer than expected. The passages most relevant to your "
+    "question are listed below; asking again shortly may return the complete answer."
+)
+
 PRESCRIPTION_RESPONSE = {
     "answer": "The text can be described, not prescribed. This assistant describes what the scriptures say but does not offer personal, ethical, or practical life advice.",
     "verses": [],
@@ -136,12 +195,92 @@ PRESCRIPTION_RESPONSE = {
 }
 
 
+def is_compare_mode(compare_texts: list[str] | None) -> bool:
+    return bool(compare_texts and len(compare_texts) > 1)
+
+
+def retrieval_args(
+    text_filter: str | None,
+    compare_texts: list[str] | None,
+    top_k: int,
+    facets: dict[str, list[str]] | None = None,
+) -> tuple[int, dict]:
+    """top_k and store filter arguments for a question."""
+    scope = {"facets": facets} if facets else {}
+    if is_compare_mode(compare_texts):
+        return top_k, {"text_filters": compare_texts, **scope}
+    if text_filter:
+        return top_k, {"text_filter": text_filter, **scope}
+    # Use higher top_k when searching all scriptures for better coverage
+    return max(top_k, 12), scope
+
+
+def canned_response(template: dict, question: str, text_filter: str | None, compare_mode: bool) -> dict:
+    resp = template.copy()
+    resp["query"] = question
+    resp["text_filter"] = text_filter
+    resp["compare_mode"] = compare_mode
+    return resp
+
+
+def guardrail_response(question: str, text_filter: str | None, compare_texts: list[str] | None) -> dict | None:
+    """The fixed reply to requests for personal advice, or None to answer normally."""
+    question_lower = question.lower().strip()
+    if not any(kw in question_lower for kw in GUARDRAIL_KEYWORDS):
+        return None
+    QUERIES.inc(outcome="guardrail")
+    return canned_response(PRESCRIPTION_RESPONSE, question, text_filter, is_compare_mode(compare_texts))
+
+
+def verse_data(v: dict) -> dict:
+    """A retrieved passage as returned to clients."""
+    return {
+        "id": v["id"],
+        "text_name": v["text_name"],
+        "section": v.get("section", ""),
+        "chapter": v["chapter"],
+        "verse": v["verse"],
+        "translation": v["translation"],
+        "translation_source": v["translation_source"],
+        "tradition": v["tradition"],
+        "relevance_score": round(v["score"], 3),
+    }
+
+
+def _record_token_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_token_count or 0, direction="in")
+    LLM_TOKENS.inc(usage.candidates_token_count or 0, direction="out")
+
+
 class ScriptureRAG:
-    def __init__(self, store: MultiCorpusVectorStore, api_key: str | None = None):
+    def __init__(self, store: MultiCorpusVectorStore, api_key: str | None = None, client=None):
         self.store = store
-        key = api_key or os.getenv("GOOGLE_API_KEY")
-        self.client = genai.Client(api_key=key)
+        self._client = client
+        self._api_key = api_key
         self.model = "gemini-2.5-flash"
+        # Input tokens for the whole prompt; passages get what the rest leaves.
+        self.input_budget = PROMPT_TOKEN_BUDGET
+        self.mmr_lambda = MMR_LAMBDA
+        self.max_per_chapter = MAX_PASSAGES_PER_CHAPTER
+        self.deadline = ANSWER_DEADLINE_SECONDS
+        self.background_completion = BACKGROUND_COMPLETION
+        self.max_background = MAX_BACKGROUND_GENERATIONS
+        self.answers = AnswerCache()
+        # Hedged async generation (see hedging.py); None sends one request.
+        self.hedge = HedgePolicy() if HEDGE_ENABLED else None
+        # Concurrency limits and priority lanes for aquery() (see admission.py).
+        self.admission = Admission()
+        # Late generations still running; held so they are not garbage collected.
+        self._background: set[asyncio.Future] = set()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client(self._api_key)
+        return self._client
 
     def query(
         self,
@@ -149,95 +288,396 @@ class ScriptureRAG:
         text_filter: str | None = None,
         compare_texts: list[str] | None = None,
         top_k: int = 8,
-        score_threshold: float = 0.3,
+        score_threshold: float | None = None,
         chat_history: list[dict] | None = None,
+        history_context: str | None = None,
+        facets: dict[str, list[str]] | None = None,
     ) -> dict:
-        compare_mode = bool(compare_texts and len(compare_texts) > 1)
-
-        question_lower = question.lower().strip()
-        if any(kw in question_lower for kw in GUARDRAIL_KEYWORDS):
-            resp = PRESCRIPTION_RESPONSE.copy()
-            resp["query"] = question
-            resp["text_filter"] = text_filter
-            resp["compare_mode"] = compare_mode
-            return resp
-
-        # Use higher top_k when searching all scriptures for better coverage
-        effective_top_k = top_k
-        if text_filter is None and not compare_mode:
-            effective_top_k = max(top_k, 12)
-
-        if compare_mode:
-            retrieved = self.store.search(question, top_k=effective_top_k, text_filters=compare_texts)
-        elif text_filter:
-            retrieved = self.store.search(question, top_k=effective_top_k, text_filter=text_filter)
-        else:
-            retrieved = self.store.search(question, top_k=effective_top_k)
+        guarded = guardrail_response(question, text_filter, compare_texts)
+        if guarded:
+            return guarded
+
+        # The store can be swapped by a reload while this query runs; keep using
+        # the one it started with.
+        store = self.store
+        effective_top_k, filters = retrieval_args(text_filter, compare_texts, top_k, facets)
+        try:
+            retrieved = store.search(
+                question,
+                top_k=effective_top_k,
+                mmr_lambda=self.mmr_lambda,
+                max_per_chapter=self.max_per_chapter,
+                **filters,
+            )
+        except Exception:
+            QUERIES.inc(outcome="error")
+            raise
+
+        return self.answer(
+            question, retrieved, store,
+            text_filter=text_filter,
+            compare_texts=compare_texts,
+            score_threshold=score_threshold,
+            chat_history=chat_history,
+            history_context=history_context,
+            facets=facets,
+        )
 
+    def retrieve_batch(self, items: list[dict], top_k: int = 8):
+        """
+        Retrieval for many questions (dicts with question, text_filter,
+        compare_texts, facets) in one embedding pass and one batched ranking.
+        Returns the store used and the passages for each item, in order.
+        """
+        store = self.store
+        args = [
+            retrieval_args(i.get("text_filter"), i.get("compare_texts"), top_k, i.get("facets"))
+            for i in items
+        ]
+        try:
+            retrieved = store.search_batch(
+                [i["question"] for i in items],
+                top_k=[k for k, _ in args],
+                filters=[f for _, f in args],
+                mmr_lambda=self.mmr_lambda,
+                max_per_chapter=self.max_per_chapter,
+            )
+        except Exception:
+            QUERIES.inc(len(items), outcome="error")
+            raise
+        return store, retrieved
+
+    async def aretrieve_batch(self, items: list[dict], top_k: int = 8):
+        """retrieve_batch() in a worker thread, holding one embed admission slot."""
+        try:
+            async with self.admission.embed.slot("normal"):
+                return await asyncio.to_thread(self.retrieve_batch, items, top_k)
+        except Overloaded:
+            QUERIES.inc(len(items), outcome="rejected")
+            raise
+
+    def answer(
+        self,
+        question: str,
+        retrieved: list[dict],
+        store: MultiCorpusVectorStore | None = None,
+        text_filter: str | None = None,
+        compare_texts: list[str] | None = None,
+        score_threshold: float | None = None,
+        chat_history: list[dict] | None = None,
+        history_context: str | None = None,
+        facets: dict[str, list[str]] | None = None,
+    ) -> dict:
+        """Answer from already retrieved passages: refuse, or build the prompt and generate."""
+        prompt = self.prepare(
+            question, retrieved, store,
+            text_filter=text_filter,
+            compare_texts=compare_texts,
+            score_threshold=score_threshold,
+            chat_history=chat_history,
+            history_context=history_context,
+            facets=facets,
+        )
+        if "response" in prompt:
+            return prompt["response"]
+        try:
+            with stage("generate"):
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=prompt["user_message"],
+                    config=self._generate_config(prompt),
+                )
+        except Exception:
+            QUERIES.inc(outcome="error")
+            raise
+        return self._answered(prompt, response)
+
+    async def aanswer(
+        self,
+        question: str,
+        retrieved: list[dict],
+        store: MultiCorpusVectorStore | None = None,
+        text_filter: str | None = None,
+        compare_texts: list[str] | None = None,
+        score_threshold: float | None = None,
+        chat_history: list[dict] | None = None,
+        facets: dict[str, list[str]] | None = None,
+    ) -> dict:
+        """
+        answer() for the event loop: generation waits for a slot in
+        self.admission in the question's lane (raising Overloaded when it
+        cannot get one) and is cancelled with the caller. No deadline.
+        """
+        prompt = self.prepare(
+            question, retrieved, store,
+            text_filter=text_filter,
+            compare_texts=compare_texts,
+            score_threshold=score_threshold,
+            chat_history=chat_history,
+            facets=facets,
+        )
+        if "response" in prompt:
+            return prompt["response"]
+        try:
+            with stage("generate"):
+                response = await self._agenerate(prompt, request_lane(question, compare_texts))
+        except asyncio.CancelledError:
+            CANCELLED.inc(stage="generate")
+            raise
+        except Overloaded:
+            QUERIES.inc(outcome="rejected")
+            raise
+        except Exception:
+            QUERIES.inc(outcome="error")
+            raise
+        return self._answered(prompt, response)
+
+    async def aquery(
+        self,
+        question: str,
+        text_filter: str | None = None,
+        compare_texts: list[str] | None = None,
+        top_k: int = 8,
+        score_threshold: float | None = None,
+        chat_history: list[dict] | None = None,
+        history_context: str | None = None,
+        facets: dict[str, list[str]] | None = None,
+        deadline: float | None = None,
+    ) -> dict:
+        """
+        query() for the event loop, answered within `deadline` seconds
+        (self.deadline by default; 0 waits for the model). Cached answers are
+        returned at once and generation is hedged when self.hedge is set.
+        Every upstream call is awaited, so cancelling aquery() (a client
+        disconnect) cancels the embedding or generation in flight.
+
+        Retrieval and generation each wait for a slot in self.admission, in
+        the question's lane. Raises Overloaded when retrieval cannot get one;
+        a generation that cannot is answered degraded, as below.
+
+        If generation has not finished by the deadline, the response is
+        degraded: the retrieved verses with DEGRADED_ANSWER and "degraded":
+        True. The generation then finishes in the background into the answer
+        cache (self.background_completion, up to self.max_background at
+        once), or is cancelled.
+        """
+        started = time.monotonic()
+        guarded = guardrail_response(question, text_filter, compare_texts)
+        if guarded:
+            return guarded
+
+        store = self.store
+        key = None
+        if not chat_history and not history_context:
+            key = cache_key(question, text_filter, compare_texts, facets, store.version)
+            cached = self.answers.get(key)
+            if cached is not None:
+                QUERIES.inc(outcome="cached")
+                return {**cached, "query": question}
+
+        lane = request_lane(question, compare_texts)
+        effective_top_k, filters = retrieval_args(text_filter, compare_texts, top_k, facets)
+        try:
+            async with self.admission.embed.slot(lane):
+                retrieved = await store.asearch(
+                    question,
+                    top_k=effective_top_k,
+                    mmr_lambda=self.mmr_lambda,
+                    max_per_chapter=self.max_per_chapter,
+                    **filters,
+                )
+        except asyncio.CancelledError:
+            CANCELLED.inc(stage="retrieve")
+            raise
+        except Overloaded:
+            QUERIES.inc(outcome="rejected")
+            raise
+        except Exception:
+            QUERIES.inc(outcome="error")
+            raise
+
+        prompt = self.prepare(
+            question, retrieved, store,
+            text_filter=text_filter,
+            compare_texts=compare_texts,
+            score_threshold=score_threshold,
+            chat_history=chat_history,
+            history_context=history_context,
+            facets=facets,
+        )
+        if "response" in prompt:
+            return prompt["response"]
+
+        deadline = self.deadline if deadline is None else deadline
+        # Retrieval spent part of the deadline; generation gets what is left.
+        remaining = max(deadline - (time.monotonic() - started), 0.0) if deadline else None
+        call = asyncio.ensure_future(self._agenerate(prompt, lane, remaining))
+        try:
+            with stage("generate"):
+                done, _ = await asyncio.wait({call}, timeout=remaining)
+        except asyncio.CancelledError:
+            # Closes the connection, so Gemini stops generating too.
+            call.cancel()
+            CANCELLED.inc(stage="generate")
+            raise
+        if call not in done:
+            return self._degrade(prompt, call)
+        try:
+            response = call.result()
+        except Overloaded:
+            # The verses are already retrieved; send them rather than nothing.
+            return self._degrade(prompt, None)
+        except Exception:
+            QUERIES.inc(outcome="error")
+            raise
+        return self._answered(prompt, response)
+
+    def prepare(
+        self,
+        question: str,
+        retrieved: list[dict],
+        store: MultiCorpusVectorStore | None = None,
+        text_filter: str | None = None,
+        compare_texts: list[str] | None = None,
+        score_threshold: float | None = None,
+        chat_history: list[dict] | None = None,
+        history_context: str | None = None,
+        facets: dict[str, list[str]] | None = None,
+    ) -> dict:
+        """
+        The prompt and generation settings for an answer, or {"response": ...}
+        when no passage clears the score threshold.
+        """
+        store = store or self.store
+        compare_mode = is_compare_mode(compare_texts)
+
+        if score_threshold is None:
+            score_threshold = store.provider.min_score
         relevant = [v for v in retrieved if v["score"] >= score_threshold]
 
         if not relevant:
-            resp = REFUSAL_RESPONSE.copy()
-            resp["query"] = question
-            resp["text_filter"] = text_filter
-            resp["compare_mode"] = compare_mode
-            return resp
+            QUERIES.inc(outcome="refused")
+            return {"response": canned_response(REFUSAL_RESPONSE, question, text_filter, compare_mode)}
 
-        context = format_context(relevant)
         system_prompt = COMPARE_PROMPT if compare_mode else SINGLE_TEXT_PROMPT
 
         mode_instruction = ""
         if compare_mode:
+            mode = "compare"
             text_names = ", ".join(compare_texts)
             mode_instruction = f"\nYou are comparing passages from: {text_names}. Address each text separately.\n"
         elif text_filter:
+            mode = "single_text"
             mode_instruction = f"\nYou are answering from: {text_filter} only.\n"
         else:
+            mode = "all_texts"
             mode_instruction = "\nYou are searching across all available scriptures.\n"
-
-        # Build base message with context and question
-        base_message = (
-            f"QUESTION: {question}\n"
-            f"{mode_instruction}\n"
-            f"PROVIDED PASSAGES (use ONLY these):\n\n{context}\n\n"
-            f"Answer using ONLY the passages above. Follow the response format exactly."
-        )
+        if facets:
+            scope = "; ".join(f"{field}: {', '.join(values)}" for field, values in facets.items() if values)
+            mode_instruction += f"Passages are limited to {scope}.\n"
 
         # Prepend conversation history if this is a follow-up in a chat
-        if chat_history:
-            user_message = format_history_context(chat_history) + base_message
+        if history_context is not None:
+            history = history_context
         else:
-            user_message = base_message
-
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=user_message,
-            config=genai.types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=0.3,
-                top_p=0.9,
-                max_output_tokens=8192,
-            ),
+            history = format_history_context(chat_history) if chat_history else ""
+
+        def build_message(context: str) -> str:
+            return (
+                f"{history}"
+                f"QUESTION: {question}\n"
+                f"{mode_instruction}\n"
+                f"PROVIDED PASSAGES (use ONLY these):\n\n{context}\n\n"
+                f"Answer using ONLY the passages above. Follow the response format exactly."
+            )
+
+        with stage("format_context"):
+            # Passages fill whatever the system prompt, history and question leave.
+            fixed_tokens = estimate_tokens(system_prompt) + estimate_tokens(build_message(""))
+            # Even when history uses up the budget, answer from the best passage.
+            room = max(self.input_budget - fixed_tokens, MIN_PASSAGE_TOKENS + PASSAGE_OVERHEAD_TOKENS)
+            passages = fit_passages(relevant, question, room)
+            user_message = build_message(format_context(passages))
+
+        cacheable = not chat_history and not history
+        return {
+            "question": question,
+            "text_filter": text_filter,
+            "compare_mode": compare_mode,
+            "relevant": relevant[: len(passages)],
+            "system_prompt": system_prompt,
+            "user_message": user_message,
+            "max_output_tokens": output_token_limit(mode, len(passages)),
+            "cache_key": cache_key(question, text_filter, compare_texts, facets, store.version) if cacheable else None,
+        }
+
+    def _generate_config(self, prompt: dict):
+        return types().GenerateContentConfig(
+            system_instruction=prompt["system_prompt"],
+            temperature=0.3,
+            top_p=0.9,
+            max_output_tokens=prompt["max_output_tokens"],
+            http_options=call_options(GENERATE_TIMEOUT),
         )
 
-        verses_data = []
-        for v in relevant:
-            verses_data.append({
-                "text_name": v["text_name"],
-                "section": v.get("section", ""),
-                "chapter": v["chapter"],
-                "verse": v["verse"],
-                "translation": v["translation"],
-                "translation_source": v["translation_source"],
-                "tradition": v["tradition"],
-                "relevance_score": round(v["score"], 3),
-            })
+    async def _agenerate(self, prompt: dict, lane: str = "normal", max_wait: float | None = None):
+        config = self._generate_config(prompt)
+
+        def call():
+            return self.client.aio.models.generate_content(
+                model=self.model, contents=prompt["user_message"], config=config
+            )
+
+        gate = self.admission.generate
+        async with gate.slot(lane, max_wait):
+            return await (call() if self.hedge is None else self.hedge.run(call, gate))
 
+    def _result(self, prompt: dict, response) -> dict:
+        _record_token_usage(response)
         return {
-            "query": question,
+            "query": prompt["question"],
             "answer": response.text,
-            "verses": verses_data,
+            "verses": [verse_data(v) for v in prompt["relevant"]],
             "raw_response": response.text,
-            "text_filter": text_filter,
-            "compare_mode": compare_mode,
+            "text_filter": prompt["text_filter"],
+            "compare_mode": prompt["compare_mode"],
+        }
+
+    def _answered(self, prompt: dict, response) -> dict:
+        QUERIES.inc(outcome="answered")
+        result = self._result(prompt, response)
+        if prompt["cache_key"] is not None:
+            self.answers.put(prompt["cache_key"], result)
+        return result
+
+    def _degrade(self, prompt: dict, call: asyncio.Future | None) -> dict:
+        """Verses-only response for a generation that missed its deadline (or never started)."""
+        QUERIES.inc(outcome="degraded")
+        if (
+            call is not None
+            and self.background_completion
+            and prompt["cache_key"] is not None
+            and len(self._background) < self.max_background
+        ):
+            self._background.add(call)
+            call.add_done_callback(functools.partial(self._background_done, prompt))
+        elif call is not None:
+            call.cancel()
+            BACKGROUND.inc(outcome="cancelled")
+        return {
+            "query": prompt["question"],
+            "answer": DEGRADED_ANSWER,
+            "verses": [verse_data(v) for v in prompt["relevant"]],
+            "raw_response": "",
+            "text_filter": prompt["text_filter"],
+            "compare_mode": prompt["compare_mode"],
+            "degraded": True,
         }
+
+    def _background_done(self, prompt: dict, call: asyncio.Future):
+        self._background.discard(call)
+        if call.cancelled() or call.exception() is not None:
+            BACKGROUND.inc(outcome="failed")
+            return
+        BACKGROUND.inc(outcome="completed")
+        self.answers.put(prompt["cache_key"], self._result(prompt, call.result()), source="background")
@@ -0,0 +1,103 @@
+"""
+Zero-downtime reloads of the vector store behind a running server.
+
+A reload loads the store file in the background, validates it, and swaps it
+into the RAG pipeline with a single attribute assignment. Queries already
+running keep the store they started with, so the previous version stays in
+memory until they finish. Reloads are triggered from the admin endpoint or by
+watching the store file for changes.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import metrics
+from vector_store import MultiCorpusVectorStore
+
+RELOADS = metrics.counter(
+    "sutra_store_reloads_total",
+    "Vector store reloads by outcome (swapped, failed).",
+    labels=("outcome",),
+)
+
+
+class ReloadInProgress(RuntimeError):
+    pass
+
+
+def _file_signature(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class StoreReloader:
+    def __init__(self, rag, path: str):
+        self.rag = rag
+        self.path = path
+        self.loading = False
+        self.last_error: str | None = None
+        self.loaded_at = time.time()
+        self._signature = _file_signature(path)
+        self._lock = threading.Lock()
+
+    def status(self) -> dict:
+        store = self.rag.store
+        return {
+            "path": self.path,
+            "version": store.version,
+            "documents": len(store.documents),
+            "embedding": store.provider.manifest(),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)),
+            "loading": self.loading,
+            "last_error": self.last_error,
+        }
+
+    def reload(self) -> MultiCorpusVectorStore:
+        """Load, validate and swap in the store file. Blocking; run it off the event loop."""
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("a reload is already running")
+        self.loading = True
+        signature = _file_signature(self.path)
+        try:
+            start = time.perf_counter()
+            old = self.rag.store
+            client = getattr(old.provider, "client", None)
+            new = MultiCorpusVectorStore.from_file(self.path, client=client)
+            new.validate()
+            self.rag.store = new
+            self.loaded_at = time.time()
+            self.last_error = None
+            RELOADS.inc(outcome="swapped")
+            print(f"Swapped vector store {old.version} -> {new.version} "
+                  f"in {time.perf_counter() - start:.1f}s")
+            return new
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            RELOADS.inc(outcome="failed")
+            print(f"Vector store reload failed, keeping {self.rag.store.version}: {self.last_error}")
+            raise
+        finally:
+            # A file that failed to load is not retried until it changes again.
+            self._signature = signature
+            self.loading = False
+            self._lock.release()
+
+    def reload_quietly(self):
+        """reload() for background tasks; failures are kept in last_error."""
+        try:
+            self.reload()
+        except Exception:
+            pass
+
+    async def watch(self, interval: float):
+        """Reload whenever the store file changes, checking every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            signature = _file_signature(self.path)
+            if signature is not None and signature != self._signature and not self.loading:
+                await asyncio.to_thread(self.reload_quietly)
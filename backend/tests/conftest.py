@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus_format import write_corpus  # noqa: E402
+from embeddings import LocalEmbeddings  # noqa: E402
+from vector_store import AVAILABLE_TEXTS, MultiCorpusVectorStore  # noqa: E402
+
+
+def entry(text_name: str, section: str, chapter: str, verse: str, translation: str) -> dict:
+    return {
+        "text_name": text_name,
+        "section": section,
+        "chapter": chapter,
+        "verse": verse,
+        "translation": translation,
+        "translation_source": "Test",
+        "tradition": AVAILABLE_TEXTS[text_name]["tradition"],
+    }
+
+
+@pytest.fixture
+def build_store(tmp_path):
+    """Build a store with local embeddings from a list of entry() dicts."""
+
+    def build(entries: list[dict]) -> MultiCorpusVectorStore:
+        for text_name, info in AVAILABLE_TEXTS.items():
+            text_entries = [e for e in entries if e["text_name"] == text_name]
+            if text_entries:
+                write_corpus(str(tmp_path / info["corpus_file"]), text_entries)
+        store = MultiCorpusVectorStore(provider=LocalEmbeddings(dims=256))
+        store.build_from_corpus_files(str(tmp_path))
+        return store
+
+    return build
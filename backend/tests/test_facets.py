@@ -0,0 +1,27 @@
+import numpy as np
+
+from doc_table import DocumentTable
+from facets import FacetIndex
+
+SECTIONS = ["Book I", "Book II", "Katha Upanishad, Part One", "Katha Upanishad", "katha upanishad", "Kathaka", ""]
+
+
+def index() -> FacetIndex:
+    table = DocumentTable.from_records([
+        {"text_name": "Upanishads", "section": section, "chapter": "1", "verse": str(i), "translation": ""}
+        for i, section in enumerate(SECTIONS)
+    ])
+    return FacetIndex(table)
+
+
+def test_exact_values_ignore_case():
+    assert index().value_rows("text_name", ["UPANISHADS"]).tolist() == list(range(len(SECTIONS)))
+    assert index().value_rows("chapter", ["2"]).tolist() == []
+
+
+def test_section_prefix_stops_at_word_boundary():
+    facets = index()
+    assert facets.value_rows("section", ["Book I"]).tolist() == [0]
+    assert facets.value_rows("section", ["katha upanishad"]).tolist() == [2, 3, 4]
+    assert facets.value_rows("section", ["Book I", "Kathaka", ""]).tolist() == [0, 5]
+    assert np.array_equal(facets.select({"section": ["Boo"]}), np.zeros(0))
@@ -0,0 +1,40 @@
+import asyncio
+
+from admission import StageGate
+from hedging import HEDGES, HedgePolicy
+
+
+def overdue_policy() -> HedgePolicy:
+    policy = HedgePolicy(percentile=50, max_rate=1.0, min_samples=1)
+    policy.record(0.01)
+    policy.tokens = 5.0
+    return policy
+
+
+async def gated_run(slots: int) -> tuple[int, int]:
+    gate = StageGate("generate", slots)
+    calls, peak = 0, 0
+
+    async def call():
+        nonlocal calls, peak
+        calls += 1
+        peak = max(peak, gate.active)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async with gate.slot():
+        assert await overdue_policy().run(call, gate) == "answer"
+    # The losing hedge gives its slot back once its cancellation lands.
+    await asyncio.sleep(0.01)
+    assert gate.active == 0
+    return calls, peak
+
+
+def test_hedge_is_skipped_without_a_free_slot():
+    skipped = HEDGES.value(outcome="no_slot")
+    assert asyncio.run(gated_run(1)) == (1, 1)
+    assert HEDGES.value(outcome="no_slot") == skipped + 1
+
+
+def test_hedge_holds_its_own_slot():
+    assert asyncio.run(gated_run(2)) == (2, 2)
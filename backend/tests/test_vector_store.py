@@ -0,0 +1,70 @@
+import numpy as np
+
+from conftest import entry
+
+UPANISHADS = [
+    entry("Upanishads", "Katha Upanishad", "1", "1", "Death taught Nachiketas the secret of the Self."),
+    entry("Upanishads", "Isha Upanishad", "1", "1", "All this is pervaded by the Lord; enjoy by renouncing."),
+    entry("Upanishads", "Kena Upanishad", "1", "2", "The Self is the ear of the ear and the mind of the mind."),
+    entry("Bhagavad Gita", "", "2", "20", "The Self is never born, nor does it ever die."),
+]
+
+
+def test_ids_distinguish_sections(build_store):
+    store = build_store(UPANISHADS)
+    ids = store.documents.column_ids()
+    assert len(set(ids)) == len(ids)
+    katha = store.row_for_id("upanishads_katha_upanishad_1_1")
+    isha = store.row_for_id("upanishads_isha_upanishad_1_1")
+    assert store.documents[katha]["section"] == "Katha Upanishad"
+    assert store.documents[isha]["section"] == "Isha Upanishad"
+    assert store.row_for_id("bhagavad_gita_2_20") is not None
+
+
+def test_repeated_passage_keys_get_their_own_ids(build_store):
+    store = build_store([
+        entry("Arthashastra", "", "I", "1", "The king shall keep his ministers close."),
+        entry("Arthashastra", "", "I", "1", "Spies shall be sent to every province."),
+    ])
+    assert store.documents.column_ids() == ["arthashastra_I_1", "arthashastra_I_1~2"]
+
+
+def test_similar_includes_other_sections_with_the_same_verse_number(build_store):
+    store = build_store(UPANISHADS)
+    similar = store.similar("upanishads_katha_upanishad_1_1", top_k=8, scope="within")
+    ids = [d["id"] for d in similar]
+    assert "upanishads_isha_upanishad_1_1" in ids
+    assert "upanishads_katha_upanishad_1_1" not in ids
+    assert store.similar("upanishads_1_1") is None
+
+
+def test_shared_verse_stays_searchable_under_each_section(build_store):
+    refrain = "He who knows the Self beyond all sorrow crosses over death."
+    store = build_store([
+        *UPANISHADS,
+        entry("Upanishads", "Katha Upanishad", "2", "12", refrain),
+        entry("Upanishads", "Mundaka Upanishad", "3", "1", refrain),
+        entry("Upanishads", "Mundaka Upanishad", "3", "2", refrain.upper()),
+    ])
+    # The within-section repeat still collapses.
+    assert [e["id"] for e in store.dedup_report] == ["upanishads_mundaka_upanishad_3_2"]
+    for section in ("Katha Upanishad", "Mundaka Upanishad"):
+        results = store.search("crosses over death", top_k=3, facets={"section": [section]})
+        assert results[0]["translation"] == refrain
+        assert results[0]["section"] == section
+
+
+def test_search_batch_matches_search_on_tied_scores(build_store, monkeypatch):
+    store = build_store([
+        entry("Bhagavad Gita", "", str(1 + i % 2), str(i), f"Verse {i} on duty and action.") for i in range(12)
+    ])
+    # Small integers keep every score exact, so only the tie order can differ.
+    store.embeddings = np.array([[1, 0, 0], [1, 1, 0], [0, 1, 0]] * 4, dtype=np.float32)
+    vectors = {"a": [1, 0, 0], "b": [1, 1, 0], "c": [2, 1, 1]}
+    monkeypatch.setattr(
+        store.provider, "embed", lambda texts, paced=False: np.array([vectors[t] for t in texts], dtype=np.float32)
+    )
+    queries = list(vectors)
+    for filters in ({}, {"text_filter": "Bhagavad Gita", "facets": {"chapter": ["2"]}}):
+        batch = store.search_batch(queries, top_k=5, filters=[filters] * len(queries))
+        assert batch == [store.search(q, top_k=5, **filters) for q in queries]
@@ -0,0 +1,121 @@
+"""
+Token budgeting for RAG prompts.
+
+Retrieved passages are fitted into a fixed input budget before generation:
+long passages are cut down to the sentences that overlap the question most
+(kept in their original order), and passages are added in relevance order
+until the budget runs out. The output token limit is sized per mode from the
+number of passages the answer has to cover.
+
+Token counts are estimates (about four characters per token for English),
+which is close enough to size a budget without a tokenizer round trip.
+"""
+
+import os
+import re
+
+import metrics
+
+CHARS_PER_TOKEN = 4
+# Longer passages are reduced to their most relevant sentences.
+PASSAGE_TOKEN_CAP = int(os.getenv("PASSAGE_TOKEN_CAP", "250"))
+# A passage is not worth sending once it has to shrink below this.
+MIN_PASSAGE_TOKENS = 40
+# Headers and labels format_context adds around each passage.
+PASSAGE_OVERHEAD_TOKENS = 30
+# Most passages one prompt carries (the all-texts top_k in rag.retrieval_args).
+MAX_CONTEXT_PASSAGES = 12
+# System prompt (about 400), question, mode instructions and a short history.
+PROMPT_FIXED_TOKENS = 1000
+# Prompt budget (system prompt, history, question and passages), in tokens.
+# The default fits MAX_CONTEXT_PASSAGES passages at the cap, so only long
+# conversation histories push passages out.
+PROMPT_TOKEN_BUDGET = int(os.getenv(
+    "PROMPT_TOKEN_BUDGET",
+    str(PROMPT_FIXED_TOKENS + MAX_CONTEXT_PASSAGES * (PASSAGE_TOKEN_CAP + PASSAGE_OVERHEAD_TOKENS)),
+))
+
+# max_output_tokens = base for the mode + per passage, capped. Gemini 2.5
+# counts thinking tokens against this limit, so the bases stay generous.
+OUTPUT_TOKENS_BASE = {"single_text": 2048, "all_texts": 2560, "compare": 3072}
+OUTPUT_TOKENS_PER_PASSAGE = 192
+MAX_OUTPUT_TOKENS = 8192
+
+ELISION = " … "
+SENTENCE_PAT = re.compile(r"(?<=[.!?;])\s+")
+WORD_PAT = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from how in is it its of on or that the their "
+    "this to was what when where which who whom why with".split()
+)
+
+PASSAGES = metrics.counter(
+    "sutra_context_passages_total",
+    "Retrieved passages by what the token budget did to them (kept, trimmed, dropped).",
+    labels=("action",),
+)
+TEXTS_DROPPED = metrics.counter(
+    "sutra_context_texts_dropped_total",
+    "Texts whose every retrieved passage the token budget dropped, by text.",
+    labels=("text_name",),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _terms(text: str) -> set[str]:
+    return {w for w in WORD_PAT.findall(text.lower()) if w not in STOPWORDS}
+
+
+def select_sentences(text: str, question: str, max_tokens: int) -> str:
+    """Shorten text to the sentences sharing the most terms with the question."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    sentences = SENTENCE_PAT.split(text)
+    terms = _terms(question)
+    # Most question terms first; earlier sentences win ties.
+    ranked = sorted(range(len(sentences)), key=lambda i: (-len(terms & _terms(sentences[i])), i))
+
+    chosen, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost <= max_tokens:
+            chosen.append(i)
+            used += cost
+    if not chosen:
+        # A single sentence longer than the cap: keep its start.
+        return text[: max_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + ELISION.rstrip()
+
+    chosen.sort()
+    parts = [sentences[chosen[0]]]
+    for prev, i in zip(chosen, chosen[1:]):
+        parts.append(ELISION if i > prev + 1 else " ")
+        parts.append(sentences[i])
+    return "".join(parts)
+
+
+def fit_passages(passages: list[dict], question: str, budget_tokens: int) -> list[dict]:
+    """
+    Fit passages (best first) into budget_tokens.
+    Returns a prefix of the passages, in order, with long translations
+    shortened; the input dicts are not modified.
+    """
+    fitted, remaining = [], budget_tokens
+    for p in passages:
+        room = min(PASSAGE_TOKEN_CAP, remaining - PASSAGE_OVERHEAD_TOKENS)
+        if room < MIN_PASSAGE_TOKENS:
+            break
+        text = select_sentences(p["translation"], question, room)
+        fitted.append({**p, "translation": text})
+        remaining -= estimate_tokens(text) + PASSAGE_OVERHEAD_TOKENS
+        PASSAGES.inc(action="trimmed" if text != p["translation"] else "kept")
+    PASSAGES.inc(len(passages) - len(fitted), action="dropped")
+    for text_name in {p["text_name"] for p in passages} - {p["text_name"] for p in fitted}:
+        TEXTS_DROPPED.inc(text_name=text_name)
+    return fitted
+
+
+def output_token_limit(mode: str, n_passages: int) -> int:
+    return min(MAX_OUTPUT_TOKENS, OUTPUT_TOKENS_BASE[mode] + OUTPUT_TOKENS_PER_PASSAGE * n_passages)
@@ -1,209 +1,686 @@
 """
-Multi-corpus vector store using Google's embedding API and numpy.
+Multi-corpus vector store using pluggable embedding providers and numpy.
 Each scripture text is stored as an independent corpus with tradition tags.
 Supports single-text retrieval and cross-text comparison.
 """
 
-import json
+import asyncio
 import os
 import pickle
+import time
 
 import numpy as np
-from google import genai
+
+from corpus_format import load_corpus
+from dedup import exact_duplicates, near_duplicates, write_report
+from doc_table import DocumentTable, assign_doc_ids, build_doc_text
+from embeddings import (
+    check_compatible,
+    legacy_manifest,
+    make_provider,
+    provider_from_manifest,
+)
+from facets import FacetIndex
+from metrics import stage
 
 STORE_PATH = "vector_store_multi.pkl"
-EMBEDDING_MODEL = "gemini-embedding-001"
+# rank_batch() scores queries in blocks of at most this many (query, document)
+# pairs, about 16 MB of float32 scores at a time.
+SCORE_BLOCK_ELEMENTS = 4_000_000
+# Neighbours kept per document in the related-verses graph, within the
+# document's own text and across the other texts.
+RELATED_K = int(os.getenv("RELATED_K", "10"))
+RELATED_SCOPES = ("within", "cross")
+# Diversified searches (MMR / per-chapter cap) choose from this many times top_k
+# of the most relevant candidates.
+MMR_POOL_FACTOR = 4
 
 AVAILABLE_TEXTS = {
-    "Bhagavad Gita": {"tradition": "Vedic", "corpus_file": "corpus_gita.json"},
-    "Upanishads": {"tradition": "Vedic", "corpus_file": "corpus_upanishads.json"},
-    "Manusmriti": {"tradition": "Dharmashastra", "corpus_file": "corpus_manusmriti.json"},
-    "Arthashastra": {"tradition": "Arthashastra", "corpus_file": "corpus_arthashastra.json"},
-    "Mahabharata": {"tradition": "Epic", "corpus_file": "corpus_mahabharata.json"},
-    "Ramayana": {"tradition": "Epic", "corpus_file": "corpus_ramayana.json"},
+    "Bhagavad Gita": {"tradition": "Vedic", "corpus_file": "corpus_gita.corpus"},
+    "Upanishads": {"tradition": "Vedic", "corpus_file": "corpus_upanishads.corpus"},
+    "Manusmriti": {"tradition": "Dharmashastra", "corpus_file": "corpus_manusmriti.corpus"},
+    "Arthashastra": {"tradition": "Arthashastra", "corpus_file": "corpus_arthashastra.corpus"},
+    "Mahabharata": {"tradition": "Epic", "corpus_file": "corpus_mahabharata.corpus"},
+    "Ramayana": {"tradition": "Epic", "corpus_file": "corpus_ramayana.corpus"},
 }
 
 
+def cosine_scores(queries: np.ndarray, docs: np.ndarray, doc_norms: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each query (row) with each document (column)."""
+    norms_query = np.linalg.norm(queries, axis=1, keepdims=True)
+    return (queries @ docs.T) / (norms_query * doc_norms.T + 1e-10)
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Column indices and values of the k largest scores in each row, best first.
+    Equal scores rank in column order, including which of them make the cut.
+    """
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64), np.zeros((len(scores), 0), dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    kth = top_scores.min(axis=1, keepdims=True)
+    # argpartition picks arbitrarily among scores tied at the cut.
+    for row in np.flatnonzero((scores == kth).sum(axis=1) > (top_scores == kth).sum(axis=1)):
+        above = np.flatnonzero(scores[row] > kth[row])
+        tied = np.flatnonzero(scores[row] == kth[row])[: k - len(above)]
+        top[row] = np.concatenate((above, tied))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top, -top_scores))
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def mmr_select(
+    embeddings: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    mmr_lambda: float = 1.0,
+    groups: np.ndarray | None = None,
+    max_per_group: int | None = None,
+) -> np.ndarray:
+    """
+    Maximal marginal relevance over a candidate pool. Each pick maximizes
+    mmr_lambda * relevance - (1 - mmr_lambda) * (highest similarity to an
+    earlier pick); at most max_per_group picks share a groups value.
+    Returns positions into the pool, in pick order.
+    """
+    unit = embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+    similarity = unit @ unit.T
+    redundancy = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    picks = []
+    while len(picks) < k and available.any():
+        marginal = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+        pick = int(np.argmax(marginal))
+        picks.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, similarity[pick], out=redundancy)
+        if max_per_group is not None:
+            group = groups == groups[pick]
+            if np.count_nonzero(group & ~available) >= max_per_group:
+                available &= ~group
+    return np.array(picks, dtype=np.int64)
+
+
 class MultiCorpusVectorStore:
-    def __init__(self, api_key: str | None = None):
-        key = api_key or os.getenv("GOOGLE_API_KEY")
-        if not key:
-            raise ValueError("GOOGLE_API_KEY is required")
-        self.client = genai.Client(api_key=key)
-        self.documents: list[dict] = []
+    def __init__(self, api_key: str | None = None, client=None, provider=None):
+        # Without an explicit provider, EMBEDDING_PROVIDER picks one (Gemini by default).
+        self.provider = provider or make_provider(client=client, api_key=api_key)
+        self.documents = DocumentTable()
         self.embeddings: np.ndarray | None = None
-        self.text_indices: dict[str, list[int]] = {}
-
-    def _embed(self, texts: list[str]) -> np.ndarray:
-        import time
-        batch_size = 50
-        all_embeddings = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
-            for attempt in range(5):
-                try:
-                    result = self.client.models.embed_content(
-                        model=EMBEDDING_MODEL,
-                        contents=batch,
-                    )
-                    for emb in result.embeddings:
-                        all_embeddings.append(emb.values)
-                    break
-                except Exception as e:
-                    if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                        wait = 2 ** attempt * 5
-                        print(f"    Rate limited, waiting {wait}s...")
-                        time.sleep(wait)
-                    else:
-                        raise
-            if (i // batch_size) % 20 == 0 and i > 0:
-                print(f"    Embedded {i + len(batch)}/{len(texts)}...")
-            time.sleep(0.5)
-        return np.array(all_embeddings, dtype=np.float32)
+        self.text_indices: dict[str, np.ndarray] = {}
+        self.version: str | None = None
+        # Related-verses graph from build_related(): scope -> (indices, scores),
+        # one row of RELATED_K neighbours per document; None for older stores.
+        self.related: dict | None = None
+        self.facet_index: FacetIndex | None = None
+        # IDs of duplicate passages collapsed at build time -> the ID kept.
+        self.aliases: dict[str, str] = {}
+        self.dedup_report: list[dict] = []
+        self._rows_by_id: dict[str, int] | None = None
+        # Document norms, cached for the embeddings array they were computed from.
+        self._norms: np.ndarray | None = None
+        self._norms_of: np.ndarray | None = None
+
+    @classmethod
+    def from_file(cls, path: str = STORE_PATH, api_key: str | None = None, client=None):
+        """Load a store together with the embedding provider recorded in its manifest."""
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        manifest = data.get("manifest") or legacy_manifest(data["embeddings"])
+        provider = provider_from_manifest(manifest, data.get("provider_state"), client=client, api_key=api_key)
+        store = cls(provider=provider)
+        store._restore(data, path)
+        return store
+
+    def _embed(self, texts: list[str], paced: bool = False) -> np.ndarray:
+        return self.provider.embed(texts, paced=paced)
 
     def _build_doc_text(self, entry: dict) -> str:
-        parts = [
-            f"{entry['text_name']}",
-        ]
-        if entry.get("section"):
-            parts.append(f"Section: {entry['section']}")
-        parts.append(f"Chapter {entry['chapter']}, Verse {entry['verse']}")
-        parts.append(f"Translation: {entry['translation']}")
-        return ". ".join(parts)
-
-    def build_from_corpus_files(self, corpus_dir: str = "."):
-        """Load all corpus JSON files and compute embeddings."""
-        self.documents = []
-        self.text_indices = {}
-        texts_to_embed = []
+        return build_doc_text(entry)
+
+    def build_from_corpus_files(self, corpus_dir: str = ".", dedup: bool = True):
+        """
+        Load all corpus files and compute embeddings. With dedup, duplicate
+        passages within a section of a text are collapsed (see dedup.py): the first copy
+        is kept, the others' IDs become aliases of it and are listed in
+        self.dedup_report.
+        """
+        records = []
 
         for text_name, info in AVAILABLE_TEXTS.items():
             path = os.path.join(corpus_dir, info["corpus_file"])
             if not os.path.exists(path):
-                print(f"  SKIP: {text_name} — {info['corpus_file']} not found")
-                continue
-
-            with open(path, "r", encoding="utf-8") as f:
-                entries = json.load(f)
-
-            start_idx = len(self.documents)
-            indices = []
-            for entry in entries:
-                doc_text = self._build_doc_text(entry)
-                idx = len(self.documents)
-                self.documents.append({
-                    "id": f"{text_name.lower().replace(' ', '_')}_{entry['chapter']}_{entry['verse']}",
-                    "text_name": entry["text_name"],
-                    "section": entry.get("section", ""),
-                    "chapter": entry["chapter"],
-                    "verse": entry["verse"],
-                    "translation": entry["translation"],
-                    "translation_source": entry["translation_source"],
-                    "tradition": entry["tradition"],
-                    "doc_text": doc_text,
-                })
-                texts_to_embed.append(doc_text)
-                indices.append(idx)
-
-            self.text_indices[text_name] = indices
+                legacy = os.path.splitext(path)[0] + ".json"
+                if not os.path.exists(legacy):
+                    print(f"  SKIP: {text_name} — {info['corpus_file']} not found")
+                    continue
+                path = legacy
+
+            entries = load_corpus(path)
+            records.extend(entries)
             print(f"  Loaded {len(entries)} entries for {text_name}")
 
-        print(f"\nTotal documents: {len(self.documents)}")
-        print(f"Computing embeddings for {len(texts_to_embed)} documents...")
-        self.embeddings = self._embed(texts_to_embed)
+        for record, doc_id in zip(records, assign_doc_ids(records)):
+            record["id"] = doc_id
+        report = []
+        if dedup:
+            # Exact copies are dropped before they cost an embedding call.
+            exact = exact_duplicates([r["translation"] for r in records], [_dedup_group(r) for r in records])
+            report += [_duplicate_entry(records[i], records[kept], "exact") for i, kept in exact.items()]
+            records = [r for i, r in enumerate(records) if i not in exact]
+
+        texts_to_embed = [self._build_doc_text(entry) for entry in records]
+        print(f"\nTotal documents: {len(records)}")
+        print(f"Computing {self.provider.name} embeddings for {len(texts_to_embed)} documents...")
+        self.provider.fit(texts_to_embed)
+        embeddings = self._embed(texts_to_embed, paced=True)
+
+        if dedup:
+            near = near_duplicates(embeddings, [r["translation"] for r in records], [_dedup_group(r) for r in records])
+            report += [
+                _duplicate_entry(records[i], records[kept], "near", cosine, overlap)
+                for i, (kept, cosine, overlap) in near.items()
+            ]
+            keep = [i for i in range(len(records)) if i not in near]
+            records = [records[i] for i in keep]
+            embeddings = embeddings[keep]
+
+        self.documents = DocumentTable.from_records(records)
+        self.facet_index = FacetIndex(self.documents)
+        self.embeddings = embeddings
+        self.text_indices = {
+            name: self.documents.indices("text_name", name) for name in self.documents.counts("text_name")
+        }
+        kept_ids = set(self.documents.column_ids())
+        self.aliases = {e["id"]: e["kept_id"] for e in report if e["id"] not in kept_ids}
+        self.dedup_report = report
+        self._rows_by_id = None
+        if report:
+            print(f"Collapsed {len(report)} duplicate passages "
+                  f"({sum(e['reason'] == 'exact' for e in report)} exact, "
+                  f"{sum(e['reason'] == 'near' for e in report)} near)")
         print(f"Embeddings shape: {self.embeddings.shape}")
+        self.build_related()
 
     def save(self, path: str = STORE_PATH):
+        """Write the store atomically, so a running server never reads a partial file."""
+        self.version = time.strftime("%Y%m%d-%H%M%S")
         data = {
+            "version": self.version,
             "documents": self.documents,
             "embeddings": self.embeddings,
             "text_indices": self.text_indices,
+            "manifest": {**self.provider.manifest(), "dims": int(self.embeddings.shape[1])},
+            "provider_state": self.provider.state(),
+            "related": self.related,
+            "aliases": self.aliases,
         }
-        with open(path, "wb") as f:
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
             pickle.dump(data, f)
+        os.replace(tmp_path, path)
         size_mb = os.path.getsize(path) / (1024 * 1024)
         print(f"Saved vector store to {path} ({size_mb:.1f} MB)")
 
     def load(self, path: str = STORE_PATH):
+        """Load a store built with this store's embedding provider."""
         with open(path, "rb") as f:
             data = pickle.load(f)
-        self.documents = data["documents"]
+        manifest = data.get("manifest") or legacy_manifest(data["embeddings"])
+        check_compatible(self.provider, manifest)
+        self.provider.load_state(data.get("provider_state"))
+        if self.provider.dims is None:
+            self.provider.dims = manifest["dims"]
+        self._restore(data, path)
+
+    def _restore(self, data: dict, path: str):
+        documents = data["documents"]
+        if isinstance(documents, list):
+            # Stores pickled before the columnar table held a list of dicts.
+            documents = DocumentTable.from_records(documents)
+        self.documents = documents
+        self.facet_index = FacetIndex(documents)
         self.embeddings = data["embeddings"]
-        self.text_indices = data["text_indices"]
-        print(f"Loaded {len(self.documents)} documents from {path}")
-        for name, indices in self.text_indices.items():
-            print(f"  {name}: {len(indices)} entries")
+        self.text_indices = {name: np.asarray(idx) for name, idx in data["text_indices"].items()}
+        self.related = data.get("related")
+        self.aliases = data.get("aliases", {})
+        self._rows_by_id = None
+        self.version = data.get("version") or f"legacy-{int(os.path.getmtime(path))}"
+        print(f"Loaded {len(self.documents)} documents from {path} "
+              f"(version {self.version}, {self.provider.name} embeddings)")
+        for name, count in self.documents.counts("text_name").items():
+            print(f"  {name}: {count} entries")
+
+    def validate(self):
+        """Raise ValueError if the loaded store is inconsistent or cannot answer a query."""
+        n = len(self.documents)
+        if self.embeddings is None or n == 0:
+            raise ValueError("store is empty")
+        if self.embeddings.ndim != 2 or self.embeddings.shape[0] != n:
+            raise ValueError(f"{n} documents but embeddings of shape {self.embeddings.shape}")
+        if self.provider.dims is not None and self.embeddings.shape[1] != self.provider.dims:
+            raise ValueError(f"embeddings have {self.embeddings.shape[1]} dims, provider expects {self.provider.dims}")
+        for name, idx in self.text_indices.items():
+            if len(idx) and (idx.min() < 0 or idx.max() >= n):
+                raise ValueError(f"text index for {name} points outside the store")
+        if not np.isfinite(self.embeddings).all():
+            raise ValueError("embeddings contain NaN or infinite values")
+        if self.related is not None:
+            for scope in RELATED_SCOPES:
+                indices, scores = self.related[scope]
+                if indices.shape[0] != n or scores.shape != indices.shape:
+                    raise ValueError(f"related-verses graph ({scope}) does not match the documents")
+        # A document's own embedding must come back as a perfect match.
+        _, scores = self._rank(self.embeddings[:1], 1, np.arange(n))
+        if len(scores) != 1 or scores[0] < 0.99:
+            raise ValueError("self-retrieval check failed")
 
     def get_available_texts(self) -> list[dict]:
         """Return list of available texts with their metadata."""
         result = []
-        for name, indices in self.text_indices.items():
+        for name, count in self.documents.counts("text_name").items():
             info = AVAILABLE_TEXTS.get(name, {})
             result.append({
                 "name": name,
                 "tradition": info.get("tradition", "Unknown"),
-                "entry_count": len(indices),
+                "entry_count": count,
             })
         return result
 
+    def _resolve_indices(
+        self,
+        text_filter: str | None = None,
+        text_filters: list[str] | None = None,
+        facets: dict[str, list[str]] | None = None,
+    ) -> np.ndarray | None:
+        """Sorted rows to search, or None when a named text is not in the store."""
+        if text_filter:
+            idx_list = self.text_indices.get(text_filter)
+        elif text_filters:
+            parts = [self.text_indices[tf] for tf in text_filters if tf in self.text_indices]
+            idx_list = np.unique(np.concatenate(parts)) if parts else None
+        else:
+            idx_list = np.arange(len(self.documents))
+        if not facets or idx_list is None:
+            return idx_list
+        if self.facet_index is None:
+            raise ValueError("This store has no facet index")
+        # The facet index only narrows a text filter; all rows need no intersection.
+        within = idx_list if (text_filter or text_filters) else None
+        return self.facet_index.select(facets, within=within)
+
+    def _doc_norms(self) -> np.ndarray:
+        if self._norms_of is not self.embeddings:
+            self._norms = np.linalg.norm(self.embeddings, axis=1, keepdims=True)
+            self._norms_of = self.embeddings
+        return self._norms
+
+    def _check_dims(self, query_emb: np.ndarray):
+        if query_emb.shape[-1] != self.embeddings.shape[1]:
+            raise ValueError(
+                f"Query embedding has {query_emb.shape[-1]} dimensions; "
+                f"the store has {self.embeddings.shape[1]}"
+            )
+
+    def _rank(self, query_emb: np.ndarray, top_k: int, idx_list: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        self._check_dims(query_emb)
+        if len(idx_list) < len(self.documents):
+            subset_embs = self.embeddings[idx_list]
+            norms_docs = self._doc_norms()[idx_list]
+        else:
+            subset_embs = self.embeddings
+            norms_docs = self._doc_norms()
+
+        # Ranked as in rank_batch(), so search() and search_batch() agree on ties.
+        similarities = cosine_scores(query_emb, subset_embs, norms_docs)
+        top_local, top_scores = top_k_rows(similarities, min(top_k, len(idx_list)))
+        return np.asarray(idx_list)[top_local[0]], top_scores[0]
+
+    def rank(
+        self,
+        query_emb: np.ndarray,
+        top_k: int = 8,
+        text_filter: str | None = None,
+        text_filters: list[str] | None = None,
+        mmr_lambda: float | None = None,
+        max_per_chapter: int | None = None,
+        facets: dict[str, list[str]] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rank documents against an already-embedded query.
+        Returns (document indices, cosine scores), best first; diversified
+        as in search() when mmr_lambda or max_per_chapter is given.
+        """
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        if self.embeddings is None or len(self.documents) == 0:
+            return empty
+        idx_list = self._resolve_indices(text_filter, text_filters, facets)
+        if idx_list is None or len(idx_list) == 0:
+            return empty
+        pool = _pool_size(top_k, mmr_lambda, max_per_chapter)
+        indices, scores = self._rank(np.atleast_2d(query_emb), pool, idx_list)
+        return self._diversify(indices, scores, top_k, mmr_lambda, max_per_chapter)
+
+    def _diversify(
+        self,
+        indices: np.ndarray,
+        scores: np.ndarray,
+        top_k: int,
+        mmr_lambda: float | None,
+        max_per_chapter: int | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if mmr_lambda is None and max_per_chapter is None:
+            return indices[:top_k], scores[:top_k]
+        codes = self.documents.codes
+        # Chapter names repeat across texts, so a chapter is a (text, chapter) pair.
+        chapters = codes["text_name"][indices].astype(np.int64) * len(self.documents.categories["chapter"])
+        chapters += codes["chapter"][indices]
+        picks = mmr_select(
+            self.embeddings[indices].astype(np.float32),
+            scores.astype(np.float32),
+            top_k,
+            1.0 if mmr_lambda is None else mmr_lambda,
+            chapters,
+            max_per_chapter,
+        )
+        return indices[picks], scores[picks]
+
+    def rank_batch(
+        self,
+        query_embs: np.ndarray,
+        top_k: int = 8,
+        filters: list[dict] | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Rank documents against many already-embedded queries at once.
+        filters: one dict per query with text_filter / text_filters / facets,
+        as for rank(); None searches every text for every query.
+        Returns one (document indices, cosine scores) pair per query, best first.
+        """
+        query_embs = np.atleast_2d(query_embs)
+        n_queries = len(query_embs)
+        if filters is not None and len(filters) != n_queries:
+            raise ValueError(f"{n_queries} queries but {len(filters)} filters")
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        n = len(self.documents)
+        if self.embeddings is None or n == 0 or n_queries == 0 or top_k <= 0:
+            return [empty] * n_queries
+        self._check_dims(query_embs)
+
+        # Documents each distinct filter excludes: None for none, True for all.
+        excluded: dict[tuple, np.ndarray | bool | None] = {}
+        keys = []
+        for f in filters or [{}] * n_queries:
+            facets = f.get("facets") or {}
+            key = (
+                f.get("text_filter"),
+                tuple(f.get("text_filters") or ()),
+                tuple(sorted((field, tuple(values)) for field, values in facets.items() if values)),
+            )
+            if key not in excluded:
+                idx = self._resolve_indices(key[0], list(key[1]), facets)
+                if idx is None or len(idx) == 0:
+                    excluded[key] = True
+                elif len(idx) == n:
+                    excluded[key] = None
+                else:
+                    mask = np.ones(n, dtype=bool)
+                    mask[idx] = False
+                    excluded[key] = mask
+            keys.append(key)
+
+        k = min(top_k, n)
+        doc_norms = self._doc_norms()
+        block = max(1, SCORE_BLOCK_ELEMENTS // n)
+        results = []
+        for start in range(0, n_queries, block):
+            queries = query_embs[start : start + block]
+            block_keys = keys[start : start + block]
+            scores = cosine_scores(queries, self.embeddings, doc_norms)
+            for row, key in enumerate(block_keys):
+                if excluded[key] is not None and excluded[key] is not True:
+                    scores[row, excluded[key]] = -np.inf
+
+            top, top_scores = top_k_rows(scores, k)
+            for row, key in enumerate(block_keys):
+                if excluded[key] is True:
+                    results.append(empty)
+                    continue
+                # Filters matching fewer than k documents leave excluded ones at -inf.
+                keep = np.isfinite(top_scores[row])
+                results.append((top[row][keep], top_scores[row][keep]))
+        return results
+
+    def _related_rows(self, rows: np.ndarray, k: int) -> dict:
+        """Nearest neighbours of `rows` within their own text and in the other texts."""
+        norms = self._doc_norms()
+        scores = cosine_scores(self.embeddings[rows], self.embeddings, norms)
+        text_codes = self.documents.codes["text_name"]
+        same_text = text_codes[rows][:, None] == text_codes[None, :]
+        # A document is not related to itself.
+        itself = rows[:, None] == np.arange(len(self.documents))[None, :]
+        k = min(k, len(self.documents))
+        within = top_k_rows(np.where(same_text & ~itself, scores, -np.inf), k)
+        cross = top_k_rows(np.where(same_text, -np.inf, scores), k)
+        return {"within": within, "cross": cross}
+
+    def build_related(self, k: int = RELATED_K):
+        """Precompute every document's k nearest neighbours (the related-verses graph)."""
+        n = len(self.documents)
+        if self.embeddings is None or n == 0:
+            return
+        start_time = time.perf_counter()
+        block = max(1, SCORE_BLOCK_ELEMENTS // n)
+        parts = {scope: ([], []) for scope in RELATED_SCOPES}
+        for start in range(0, n, block):
+            rows = np.arange(start, min(start + block, n))
+            for scope, (indices, scores) in self._related_rows(rows, k).items():
+                parts[scope][0].append(indices.astype(np.int32))
+                parts[scope][1].append(scores.astype(np.float32))
+        self.related = {scope: (np.concatenate(i), np.concatenate(sc)) for scope, (i, sc) in parts.items()}
+        print(f"Related-verses graph: {k} neighbours x {n} documents in {time.perf_counter() - start_time:.1f}s")
+
+    def row_for_id(self, doc_id: str) -> int | None:
+        """The row of a document ID, following the alias of a duplicate collapsed at build time."""
+        if self._rows_by_id is None:
+            self._rows_by_id = {row_id: row for row, row_id in enumerate(self.documents.column_ids())}
+        row = self._rows_by_id.get(doc_id)
+        return self._rows_by_id.get(self.aliases.get(doc_id)) if row is None else row
+
+    def similar(self, doc_id: str, top_k: int = 8, scope: str = "all") -> list[dict] | None:
+        """
+        Documents most similar to a document ID, from the related-verses graph.
+        scope: "within" its own text, "cross" (other texts) or "all".
+        Returns None for an unknown ID. Stores built before the graph existed
+        compute the neighbours from the stored embeddings instead.
+        """
+        row = self.row_for_id(doc_id)
+        if row is None:
+            return None
+        scopes = RELATED_SCOPES if scope == "all" else (scope,)
+        if self.related is not None:
+            graph = {s: (self.related[s][0][row], self.related[s][1][row]) for s in scopes}
+        else:
+            graph = {s: (i[0], sc[0]) for s, (i, sc) in self._related_rows(np.array([row]), max(top_k, RELATED_K)).items()}
+
+        # The scopes are disjoint, so merging them is a sort by score.
+        ranked = sorted(
+            ((float(score), int(neighbour)) for s in scopes for neighbour, score in zip(*graph[s]) if np.isfinite(score)),
+            key=lambda pair: -pair[0],
+        )[:top_k]
+        return self._materialize([row for _, row in ranked], [score for score, _ in ranked])
+
     def search(
         self,
         query: str,
         top_k: int = 8,
         text_filter: str | None = None,
         text_filters: list[str] | None = None,
+        mmr_lambda: float | None = None,
+        max_per_chapter: int | None = None,
+        facets: dict[str, list[str]] | None = None,
     ) -> list[dict]:
         """
         Search for relevant entries.
         text_filter: single text name to restrict search (default retrieval)
         text_filters: list of text names for comparison mode
+        mmr_lambda: diversify the results with maximal marginal relevance;
+            1.0 ranks by relevance alone, lower values favour passages unlike
+            those already chosen. Results keep their relevance scores.
+        max_per_chapter: at most this many results from one chapter (canto)
+        facets: tradition / text_name / section / chapter values to restrict
+            to (see facets.py), combined with the text filters
         """
         if self.embeddings is None or len(self.documents) == 0:
             return []
 
-        query_emb = self._embed([query])
+        idx_list = self._resolve_indices(text_filter, text_filters, facets)
+        if idx_list is None or len(idx_list) == 0:
+            return []
 
-        if text_filter:
-            allowed_indices = set(self.text_indices.get(text_filter, []))
-        elif text_filters:
-            allowed_indices = set()
-            for tf in text_filters:
-                allowed_indices.update(self.text_indices.get(tf, []))
-        else:
-            allowed_indices = None
+        with stage("embed"):
+            query_emb = self._embed([query])
+        return self._search_embedded(query_emb, idx_list, top_k, mmr_lambda, max_per_chapter)
 
-        if allowed_indices is not None and len(allowed_indices) == 0:
+    async def asearch(
+        self,
+        query: str,
+        top_k: int = 8,
+        text_filter: str | None = None,
+        text_filters: list[str] | None = None,
+        mmr_lambda: float | None = None,
+        max_per_chapter: int | None = None,
+        facets: dict[str, list[str]] | None = None,
+    ) -> list[dict]:
+        """
+        search() for the event loop: the query is embedded with the provider's
+        async call, so cancelling the search cancels it, and ranking runs in a
+        worker thread.
+        """
+        if self.embeddings is None or len(self.documents) == 0:
             return []
 
-        if allowed_indices is not None:
-            idx_list = sorted(allowed_indices)
-            subset_embs = self.embeddings[idx_list]
-        else:
-            idx_list = list(range(len(self.documents)))
-            subset_embs = self.embeddings
+        idx_list = self._resolve_indices(text_filter, text_filters, facets)
+        if idx_list is None or len(idx_list) == 0:
+            return []
+
+        with stage("embed"):
+            query_emb = await self.provider.aembed([query])
+        return await asyncio.to_thread(
+            self._search_embedded, query_emb, idx_list, top_k, mmr_lambda, max_per_chapter
+        )
 
-        norms_docs = np.linalg.norm(subset_embs, axis=1, keepdims=True)
-        norms_query = np.linalg.norm(query_emb, axis=1, keepdims=True)
-        similarities = (subset_embs @ query_emb.T) / (norms_docs * norms_query.T + 1e-10)
-        similarities = similarities.flatten()
+    def _search_embedded(
+        self,
+        query_emb: np.ndarray,
+        idx_list: np.ndarray,
+        top_k: int,
+        mmr_lambda: float | None,
+        max_per_chapter: int | None,
+    ) -> list[dict]:
+        with stage("search"):
+            pool = _pool_size(top_k, mmr_lambda, max_per_chapter)
+            indices, scores = self._rank(query_emb, pool, idx_list)
+            indices, scores = self._diversify(indices, scores, top_k, mmr_lambda, max_per_chapter)
+            return self._materialize(indices, scores)
+
+    def search_batch(
+        self,
+        queries: list[str],
+        top_k: int | list[int] = 8,
+        filters: list[dict] | None = None,
+        mmr_lambda: float | None = None,
+        max_per_chapter: int | None = None,
+    ) -> list[list[dict]]:
+        """
+        search() for many queries: one embedding call for all of them and
+        batched scoring with rank_batch(). top_k is one int or one per query;
+        filters is one dict per query (text_filter / text_filters / facets) or
+        None. Each query gets what search() with its own top_k returns.
+        Results are in query order.
+        """
+        if not queries or self.embeddings is None or len(self.documents) == 0:
+            return [[] for _ in queries]
+        ks = [top_k] * len(queries) if isinstance(top_k, int) else list(top_k)
+        pools = [_pool_size(k, mmr_lambda, max_per_chapter) for k in ks]
+
+        with stage("embed"):
+            query_embs = self._embed(list(queries))
+
+        with stage("search"):
+            ranked = self.rank_batch(query_embs, max(pools), filters)
+            # Ranked best first, so each query's own candidate pool is a prefix;
+            # diversifying that (not the largest pool) matches search().
+            results = [
+                self._materialize(*self._diversify(indices[:pool], scores[:pool], k, mmr_lambda, max_per_chapter))
+                for (indices, scores), k, pool in zip(ranked, ks, pools)
+            ]
+        return results
 
-        top_local = np.argsort(similarities)[::-1][:top_k]
+    def _materialize(self, indices: np.ndarray, scores: np.ndarray) -> list[dict]:
         results = []
-        for local_idx in top_local:
-            global_idx = idx_list[local_idx]
-            doc = self.documents[global_idx].copy()
-            doc["score"] = float(similarities[local_idx])
+        for global_idx, score in zip(indices, scores):
+            doc = self.documents[int(global_idx)].to_dict()
+            doc["score"] = float(score)
             results.append(doc)
         return results
 
 
+def _dedup_group(record: dict) -> str:
+    # A passage repeated in two Upanishads belongs to both, so section
+    # facets must still find each copy.
+    return f"{record['text_name']}\x00{record.get('section', '')}"
+
+
+def _duplicate_entry(
+    record: dict,
+    kept: dict,
+    reason: str,
+    cosine: float | None = None,
+    overlap: float | None = None,
+) -> dict:
+    entry = {
+        "reason": reason,
+        "text_name": record["text_name"],
+        "section": record.get("section", ""),
+        "id": record["id"],
+        "kept_id": kept["id"],
+        "translation": record["translation"][:120],
+    }
+    if cosine is not None:
+        entry["cosine"] = round(cosine, 4)
+        entry["jaccard"] = round(overlap, 4)
+    return entry
+
+
+def _pool_size(top_k: int, mmr_lambda: float | None, max_per_chapter: int | None) -> int:
+    if mmr_lambda is None and max_per_chapter is None:
+        return top_k
+    return top_k * MMR_POOL_FACTOR
+
+
 def main():
+    """
+    python vector_store.py [gemini|local] — build the store (default: EMBEDDING_PROVIDER).
+    python vector_store.py related — add the related-verses graph to an existing store.
+    """
+    import sys
+
     from dotenv import load_dotenv
     load_dotenv()
 
-    store = MultiCorpusVectorStore()
+    if sys.argv[1:2] == ["related"]:
+        store = MultiCorpusVectorStore.from_file(STORE_PATH)
+        store.build_related()
+        store.save()
+        return
+
+    store = MultiCorpusVectorStore(provider=make_provider(sys.argv[1] if len(sys.argv) > 1 else None))
     store.build_from_corpus_files(".")
     store.save()
+    write_report(store.dedup_report, os.path.splitext(STORE_PATH)[0] + ".dedup.json")
 
     print("\n--- Test: 'What is the soul?' (Bhagavad Gita only) ---")
     for r in store.search("What is the soul?", top_k=3, text_filter="Bhagavad Gita"):
@@ -360,6 +360,7 @@ export default function App() {
   const [chatMode, setChatMode] = useState(false);
   const [messages, setMessages] = useState([]);
   const [chatLoading, setChatLoading] = useState(false);
+  const [conversationId, setConversationId] = useState(null);
   const chatBottomRef = useRef(null);
 
   useEffect(() => {
@@ -373,6 +374,11 @@ export default function App() {
       .catch(() => {});
   }, []);
 
+  // A cleared chat starts a new server-side conversation
+  useEffect(() => {
+    if (messages.length === 0) setConversationId(null);
+  }, [messages.length]);
+
   // Scroll chat to bottom when new messages arrive
   useEffect(() => {
     if (chatMode && chatBottomRef.current) {
@@ -486,7 +492,11 @@ export default function App() {
     const text = (q || question).trim();
     if (!text || chatLoading) return;
 
-    // Build history from current messages (last 3 pairs)
+    // The server keeps a summary of the conversation under its ID. History
+    // is sent to start it (empty) or if the server has lost it (409).
+    const isNew = !conversationId;
+    const convId = conversationId || crypto.randomUUID();
+    setConversationId(convId);
     const history = messages
       .filter((m) => m.role === "user" || m.role === "assistant")
       .slice(-6)
@@ -501,20 +511,27 @@ export default function App() {
     setChatLoading(true);
     setError(null);
 
-    const body = { question: text, chat_history: history };
+    const body = { question: text, conversation_id: convId };
+    if (isNew) body.chat_history = history;
     if (compareMode && compareTexts.length > 1) {
       body.compare_texts = compareTexts;
     } else if (selectedText) {
       body.text_filter = selectedText;
     }
 
-    try {
-      const res = await fetch(`${API_URL}/ask`, {
+    const post = (payload) =>
+      fetch(`${API_URL}/ask`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(body),
+        body: JSON.stringify(payload),
       });
 
+    try {
+      let res = await post(body);
+      if (res.status === 409) {
+        res = await post({ ...body, chat_history: history });
+      }
+
       if (!res.ok) {
         const errData = await res.json().catch(() => null);
         throw new Error(errData?.detail || `Server error (${res.status})`);